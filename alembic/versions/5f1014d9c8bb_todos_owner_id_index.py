@@ -0,0 +1,42 @@
+"""Index todos by owner
+
+Revision ID: 5f1014d9c8bb
+Revises: 024248a861ff
+Create Date: 2026-10-18 09:12:44.103517
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f1014d9c8bb"
+down_revision: Union[str, None] = "024248a861ff"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every todo listing filters on owner_id and walks id in order (keyset
+    # pagination), so (owner_id, id) serves both the filter and the sort.
+    # users.username / users.email lookups are already served by the indexes
+    # behind their unique constraints.
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todos_owner_id_id",
+            "todos",
+            ["owner_id", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_todos_owner_id_id",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
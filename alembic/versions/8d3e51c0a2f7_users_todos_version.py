@@ -0,0 +1,77 @@
+"""Per-user todos version for ETags
+
+Revision ID: 8d3e51c0a2f7
+Revises: 5f1014d9c8bb
+Create Date: 2026-10-18 11:40:03.612904
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d3e51c0a2f7"
+down_revision: Union[str, None] = "5f1014d9c8bb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("todos_version", sa.Integer(), server_default="0", nullable=False),
+    )
+    # One bump per statement and owner, read from the transition tables; a
+    # trigger with transition tables takes a single event.
+    op.execute(
+        """
+        CREATE FUNCTION bump_todos_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE users SET todos_version = todos_version + 1
+                WHERE id IN (SELECT owner_id FROM new_todos);
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE users SET todos_version = todos_version + 1
+                WHERE id IN (SELECT owner_id FROM old_todos);
+            ELSE
+                UPDATE users SET todos_version = todos_version + 1
+                WHERE id IN (
+                    SELECT owner_id FROM old_todos
+                    UNION SELECT owner_id FROM new_todos
+                );
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER todos_version_insert AFTER INSERT ON todos
+        REFERENCING NEW TABLE AS new_todos
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_todos_version()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER todos_version_update AFTER UPDATE ON todos
+        REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_todos_version()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER todos_version_delete AFTER DELETE ON todos
+        REFERENCING OLD TABLE AS old_todos
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_todos_version()
+        """
+    )
+
+
+def downgrade() -> None:
+    for operation in ("insert", "update", "delete"):
+        op.execute(f"DROP TRIGGER todos_version_{operation} ON todos")
+    op.execute("DROP FUNCTION bump_todos_version()")
+    op.drop_column("users", "todos_version")
@@ -0,0 +1,39 @@
+"""Index todos by owner and priority
+
+Revision ID: b71c4e9d3a25
+Revises: 8d3e51c0a2f7
+Create Date: 2026-10-18 14:05:37.281940
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b71c4e9d3a25"
+down_revision: Union[str, None] = "8d3e51c0a2f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GET /api/?sort=priority walks (priority, id) within one owner, in either
+    # direction; the other filters are applied to that range.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todos_owner_id_priority_id",
+            "todos",
+            ["owner_id", "priority", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_todos_owner_id_priority_id",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
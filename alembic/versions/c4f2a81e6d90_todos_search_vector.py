@@ -0,0 +1,49 @@
+"""Full-text search vector on todos
+
+Revision ID: c4f2a81e6d90
+Revises: b71c4e9d3a25
+Create Date: 2026-10-18 15:22:09.540117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4f2a81e6d90"
+down_revision: Union[str, None] = "b71c4e9d3a25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A stored generated column is recomputed by Postgres on every write, so
+    # no trigger is needed. Adding it rewrites the table once.
+    op.execute(
+        """
+        ALTER TABLE todos ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todos_search_vector",
+            "todos",
+            ["search_vector"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_todos_search_vector",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("todos", "search_vector")
@@ -0,0 +1,121 @@
+"""Per-user todo counts
+
+Revision ID: e93b0d5c7f18
+Revises: c4f2a81e6d90
+Create Date: 2026-10-18 16:48:51.027634
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e93b0d5c7f18"
+down_revision: Union[str, None] = "c4f2a81e6d90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_stats",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("complete", sa.Boolean(), nullable=False),
+        sa.Column("count", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("owner_id", "priority", "complete"),
+    )
+    # Statement-level: each statement's transition tables are aggregated
+    # into one upsert per (owner, priority, complete).
+    op.execute(
+        """
+        CREATE FUNCTION count_todo_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO todo_stats (owner_id, priority, complete, count)
+                SELECT owner_id, coalesce(priority, 0), coalesce(complete, false),
+                    count(*)
+                FROM new_todos
+                WHERE owner_id IS NOT NULL
+                GROUP BY 1, 2, 3
+                ON CONFLICT (owner_id, priority, complete)
+                DO UPDATE SET count = todo_stats.count + excluded.count;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE todo_stats SET count = todo_stats.count - deleted.count
+                FROM (
+                    SELECT owner_id, coalesce(priority, 0) AS priority,
+                        coalesce(complete, false) AS complete, count(*) AS count
+                    FROM old_todos
+                    WHERE owner_id IS NOT NULL
+                    GROUP BY 1, 2, 3
+                ) AS deleted
+                WHERE todo_stats.owner_id = deleted.owner_id
+                    AND todo_stats.priority = deleted.priority
+                    AND todo_stats.complete = deleted.complete;
+            ELSE
+                INSERT INTO todo_stats (owner_id, priority, complete, count)
+                SELECT owner_id, priority, complete, sum(delta)
+                FROM (
+                    SELECT owner_id, coalesce(priority, 0) AS priority,
+                        coalesce(complete, false) AS complete, 1 AS delta
+                    FROM new_todos
+                    UNION ALL
+                    SELECT owner_id, coalesce(priority, 0),
+                        coalesce(complete, false), -1
+                    FROM old_todos
+                ) AS changes
+                WHERE owner_id IS NOT NULL
+                GROUP BY 1, 2, 3
+                HAVING sum(delta) <> 0
+                ON CONFLICT (owner_id, priority, complete)
+                DO UPDATE SET count = todo_stats.count + excluded.count;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # Backfill and install the trigger with writes to todos blocked, so no
+    # row is counted twice or missed.
+    op.execute("LOCK TABLE todos IN SHARE MODE")
+    op.execute(
+        """
+        INSERT INTO todo_stats (owner_id, priority, complete, count)
+        SELECT owner_id, coalesce(priority, 0), coalesce(complete, false), count(*)
+        FROM todos
+        WHERE owner_id IS NOT NULL
+        GROUP BY 1, 2, 3
+        """
+    )
+    # Named to fire after todos_version_* (Postgres goes by name), so the
+    # owner's users row is always locked before any todo_stats row.
+    op.execute(
+        """
+        CREATE TRIGGER todos_write_stats_insert AFTER INSERT ON todos
+        REFERENCING NEW TABLE AS new_todos
+        FOR EACH STATEMENT EXECUTE FUNCTION count_todo_stats()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER todos_write_stats_update AFTER UPDATE ON todos
+        REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos
+        FOR EACH STATEMENT EXECUTE FUNCTION count_todo_stats()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER todos_write_stats_delete AFTER DELETE ON todos
+        REFERENCING OLD TABLE AS old_todos
+        FOR EACH STATEMENT EXECUTE FUNCTION count_todo_stats()
+        """
+    )
+
+
+def downgrade() -> None:
+    for operation in ("insert", "update", "delete"):
+        op.execute(f"DROP TRIGGER todos_write_stats_{operation} ON todos")
+    op.execute("DROP FUNCTION count_todo_stats()")
+    op.drop_table("todo_stats")
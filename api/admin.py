@@ -1,24 +1,186 @@
-from typing import Annotated
+import csv
+import io
+from typing import Annotated, Callable, Literal, Optional
 
-from fastapi import Depends, HTTPException, Path, APIRouter
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import Depends, HTTPException, Path, APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.db.database import get_db
+from app.db.database import (
+    async_pool_metrics,
+    get_async_db,
+    get_session_factory,
+    pool_metrics,
+    replica_pool_metrics,
+)
 from app.db.models import Todos
-from .auth import get_current_user
+from app.db.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    fetch_page,
+)
+from app.hashing import password_hasher
+from app.db.routing import read_router
+from app.db.stats import all_owners_statement, all_stats_statement, summarize
+from app.throttle import login_throttle
+from .auth import get_read_db, get_request_user, token_cache
+from .todos import TodoPage, TodoStatsResponse, page_cache
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[Optional[dict], Depends(get_request_user)]
+session_factory_dependency = Annotated[Callable, Depends(get_session_factory)]
 
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = (
+    Todos.id,
+    Todos.owner_id,
+    Todos.title,
+    Todos.description,
+    Todos.priority,
+    Todos.complete,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
 
-@router.get("/todo", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+
+class TodoStatsSummary(TodoStatsResponse):
+    owners: int
+
+
+@router.get("/todo", status_code=status.HTTP_200_OK, response_model=TodoPage)
+async def read_all(
+    user: user_dependency,
+    db: read_db_dependency,
+    limit: Annotated[int, Query(gt=0, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    try:
+        after = decode_cursor(cursor, "id", size=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Keyed on id alone: owner_id is nullable, and NULLs neither compare in a
+    # row value nor sort the same way on every database. Ids start at 1, so
+    # the first page is the same primary-key range scan as the rest.
+    after_id = after[0] if after is not None else 0
+    statement = select(Todos.__table__).where(Todos.id > after_id).order_by(Todos.id)
+    return await fetch_page(db, statement, limit, "id", ("id",))
+
+
+@router.get("/todo/export", status_code=status.HTTP_200_OK)
+async def export_todos(
+    user: user_dependency,
+    session_factory: session_factory_dependency,
+    export_format: Annotated[
+        Literal["ndjson", "csv"], Query(alias="format")
+    ] = "ndjson",
+    owner_id: Annotated[Optional[int], Query(gt=0)] = None,
+    complete: Optional[bool] = None,
+):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    statement = select(*EXPORT_COLUMNS).order_by(Todos.owner_id, Todos.id)
+    if owner_id is not None:
+        statement = statement.where(Todos.owner_id == owner_id)
+    if complete is not None:
+        statement = statement.where(Todos.complete == complete)
+    statement = statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    encode = _encode_csv if export_format == "csv" else _encode_ndjson
+
+    async def body():
+        # The request-scoped session is already closed once the response
+        # starts streaming, so the export owns its session (and cursor).
+        async with session_factory() as db:
+            if export_format == "csv":
+                yield _encode_csv([EXPORT_FIELDS])
+            result = await db.stream(statement)
+            async for rows in result.partitions(EXPORT_BATCH_SIZE):
+                yield encode(rows)
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=todos.{export_format}"},
+    )
+
+
+def _encode_ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n" for row in rows)
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+@router.get(
+    "/stats/todos", status_code=status.HTTP_200_OK, response_model=TodoStatsSummary
+)
+async def todo_stats(user: user_dependency, db: read_db_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    result = await db.execute(all_stats_statement())
+    owners = await db.scalar(all_owners_statement())
+    return {**summarize(result.all()), "owners": owners}
+
+
+@router.get("/stats/hashing", status_code=status.HTTP_200_OK)
+async def hashing_stats(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    return password_hasher.stats()
+
+
+@router.get("/stats/token-cache", status_code=status.HTTP_200_OK)
+async def token_cache_stats(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    return token_cache.stats()
+
+
+@router.get("/stats/login-throttle", status_code=status.HTTP_200_OK)
+async def login_throttle_stats(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    return login_throttle.stats()
+
+
+@router.get("/stats/page-cache", status_code=status.HTTP_200_OK)
+async def page_cache_stats(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    return page_cache.stats()
+
+
+@router.get("/stats/pool", status_code=status.HTTP_200_OK)
+async def pool_stats(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    return {
+        "sync": pool_metrics.stats(),
+        "async": async_pool_metrics.stats(),
+        "replica": replica_pool_metrics.stats(),
+        "routing": read_router.stats(),
+    }
+
+
+@router.get("/stats/startup", status_code=status.HTTP_200_OK)
+async def startup_stats(user: user_dependency, request: Request):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(Todos).all()
+    return getattr(request.app.state, "startup", {})
 
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -27,8 +189,14 @@ async def delete_todo(
 ):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).first()
-    if todo_model is None:
+    # todos.owner_id is nullable, so test for the row rather than its owner.
+    deleted_id = await db.scalar(
+        delete(Todos)
+        .where(Todos.id == todo_id)
+        .returning(Todos.id)
+        .execution_options(synchronize_session=False)
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Todo not found")
-    db.query(Todos).filter(Todos.id == todo_id).delete()
-    db.commit()
+    await db.commit()
+    await read_router.mark_write(user.get("id"))
@@ -1,26 +1,40 @@
+import hashlib
+import math
 import os
+import time
 from datetime import timedelta, datetime
 from typing import Annotated, Optional
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.db.database import get_db
+from app.db.database import get_async_db
+from app.cache import LRUCache
 from app.db.models import Users
+from app.db.routing import read_router
+from app.hashing import password_hasher
+from app.metrics import registry as metrics_registry
+from app.throttle import login_throttle
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 load_dotenv()
 secret_key: str = os.getenv("SECRET_KEY")
 alg: str = os.getenv("ALGORITHM")
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Decoded claims of verified tokens, keyed by token digest and dropped at the
+# token's `exp`, so repeat requests skip signature verification.
+token_cache = LRUCache(int(os.getenv("TOKEN_CACHE_SIZE", 4096)))
+
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="api/auth/token")
+optional_oauth2_bearer = OAuth2PasswordBearer(
+    tokenUrl="api/auth/token", auto_error=False
+)
 
 
 class CreateUserRequest(BaseModel):
@@ -38,14 +52,16 @@ class Token(BaseModel):
     token_type: str
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
 
 
-def authenticate_user(username: str, password: str, db) -> Optional[CreateUserRequest]:
-    user = db.query(Users).filter(Users.username == username).first()
+async def authenticate_user(
+    username: str, password: str, db
+) -> Optional[CreateUserRequest]:
+    user = await db.scalar(select(Users).where(Users.username == username))
     if not user:
         raise ValueError("User not found")
-    if not bcrypt_context.verify(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         raise ValueError("Incorrect password")
     return user
 
@@ -53,6 +69,8 @@ def authenticate_user(username: str, password: str, db) -> Optional[CreateUserRe
 def create_access_token(
     username: str, user_id: int, role: str, expires_delta: timedelta
 ):
+    from jose import jwt
+
     encode = {"sub": username, "id": user_id, "role": role}
     expires = datetime.utcnow() + expires_delta
     encode.update({"exp": expires})
@@ -60,6 +78,15 @@ def create_access_token(
 
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
+    token_digest = hashlib.sha256(token.encode()).digest()
+    user = token_cache.get(token_digest)
+    if user is not None:
+        return dict(user)
+
+    # Imported on first use: jose (and its crypto backend) is slow to import
+    # and only needed once a token has to be verified.
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, secret_key, algorithms=[alg])
         username: str = payload.get("sub")
@@ -70,50 +97,126 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate user",
             )
-        return {"username": username, "id": user_id, "user_role": user_role}
+        user = {"username": username, "id": user_id, "user_role": user_role}
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user"
         )
 
+    # Tokens without an expiry are not cached, they would never be evicted.
+    if payload.get("exp") is not None:
+        token_cache.set(token_digest, user, expires_at=payload["exp"])
+    return dict(user)
+
+
+async def get_request_user(
+    request: Request,
+    token: Annotated[Optional[str], Depends(optional_oauth2_bearer)],
+) -> Optional[dict]:
+    """
+    The user behind this request, from the bearer token or else the
+    access_token cookie, or None when neither holds a valid token.
+
+    Resolved once per request and kept on `request.state.user`, with the time
+    it took on `request.state.auth_seconds`.
+    """
+    if hasattr(request.state, "user"):
+        return request.state.user
+
+    started = time.perf_counter()
+    source = "bearer"
+    if token is None:
+        token = request.cookies.get("access_token")
+        source = "cookie" if token is not None else "anonymous"
+    user = None
+    if token is not None:
+        try:
+            user = await get_current_user(token)
+        except HTTPException:
+            source = f"{source}_invalid"
+    request.state.user = user
+    request.state.auth_seconds = time.perf_counter() - started
+    metrics_registry.record_auth(source, request.state.auth_seconds)
+    return user
+
+
+async def get_read_db(
+    user: Annotated[Optional[dict], Depends(get_request_user)], db: db_dependency
+):
+    """
+    Session for read-only endpoints: the replica when one is configured,
+    the primary while the user is inside their read-your-writes window.
+    """
+    async with read_router.session(user.get("id") if user else None, db) as read_db:
+        yield read_db
+
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_user(db: db_dependency, create_user_request: CreateUserRequest):
+    # One query answers both uniqueness checks, and it runs before the bcrypt
+    # hash so a conflicting registration costs no hashing at all.
+    existing = await db.execute(
+        select(Users.username, Users.email).where(
+            or_(
+                Users.username == create_user_request.username,
+                Users.email == create_user_request.email,
+            )
+        )
+    )
+    existing = existing.all()
+
+    if any(row.username == create_user_request.username for row in existing):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Username already exists"
+        )
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Email already exists"
+        )
+
     create_user_model = Users(
         email=create_user_request.email,
         username=create_user_request.username,
         first_name=create_user_request.first_name,
         last_name=create_user_request.last_name,
         role=create_user_request.role,
-        hashed_password=bcrypt_context.hash(create_user_request.password),
+        hashed_password=await password_hasher.hash(create_user_request.password),
         is_active=True,
         phone_number=create_user_request.phone_number,
     )
-    validate_unique_username = (
-        db.query(Users).filter(Users.username == create_user_model.username).first()
-    )
-    validate_unique_email = (
-        db.query(Users).filter(Users.email == create_user_model.email).first()
-    )
-
-    if validate_unique_username:
+    db.add(create_user_model)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent registration took the username or email in between.
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT, detail="Username already exists"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Username or email already exists",
         )
-    if validate_unique_email:
+
+
+async def throttle_login(request: Request, username: Optional[str]) -> None:
+    """Reject the attempt with 429 if its client IP or username is throttled."""
+    client_ip = request.client.host if request.client is not None else None
+    wait = await login_throttle.check(username, client_ip)
+    if wait:
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT, detail="Email already exists"
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(wait))},
         )
 
-    db.add(create_user_model)
-    db.commit()
-
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
-    form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency
+    request: Request,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    db: db_dependency,
 ):
-    user = authenticate_user(form_data.username, form_data.password, db)
+    # Before the user lookup and the bcrypt verify, which is the point.
+    await throttle_login(request, form_data.username)
+    user = await authenticate_user(form_data.username, form_data.password, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user"
@@ -1,14 +1,35 @@
-from typing import Annotated, Optional
+import hashlib
+import os
+from typing import Annotated, Literal, Optional
 
-from fastapi import Depends, HTTPException, Path, APIRouter
-from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from fastapi import (
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    APIRouter,
+    Query,
+    Response,
+)
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import lambda_stmt, select, delete, insert, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.db.database import get_db
-from app.db.models import Todos
-from .auth import get_current_user
+from app.cache import FragmentCache
+from app.db.database import get_async_db
+from app.db.models import Todos, Users
+from app.db.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    fetch_page,
+)
+from app.db.routing import read_router
+from app.db.search import search_statement
+from app.db.stats import summarize, user_stats_statement
+from .auth import get_read_db, get_request_user
 
 router = APIRouter(tags=["todo"])
 
@@ -17,16 +38,26 @@ db_dependency variable is used to define a dependency on a database session,
 which can be injected into other functions or components in the application.
 It uses the `Annotated` function from the typing module to provide additional 
 metadata about the dependency.
-The dependency itself is declared as Depends(get_db), which means that 
-whenever this dependency is required, it will call the `get_db()` function 
+The dependency itself is declared as Depends(get_async_db), which means that 
+whenever this dependency is required, it will call the `get_async_db()` function 
 to provide the necessary database session.
-The type hint `Session` indicates that the dependency is expected to be 
-of type `Session`.
+The type hint `AsyncSession` indicates that the dependency is expected to be 
+of type `AsyncSession` (or the awaitable `ThreadedSession` when DB_ASYNC is off).
 """
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[Optional[dict], Depends(get_request_user)]
 
-templates = Jinja2Templates(directory="templates")
+MAX_BATCH_SIZE = 500
+MAX_SEARCH_OFFSET = 10_000
+
+TodoSort = Literal["id", "-id", "priority", "-priority"]
+
+# Rendered /todos pages, keyed by user and users.todos_version.
+page_cache = FragmentCache(
+    int(os.getenv("PAGE_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("PAGE_CACHE_TTL", 30)),
+)
 
 
 class TodoRequest(BaseModel):
@@ -36,26 +67,265 @@ class TodoRequest(BaseModel):
     complete: bool
 
 
-@router.get("/api/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+class TodoResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: Optional[str]
+    description: Optional[str]
+    priority: Optional[int]
+    complete: Optional[bool]
+    owner_id: Optional[int]
+
+
+class TodoPage(BaseModel):
+    todos: list[TodoResponse]
+    next_cursor: Optional[str]
+
+
+class TodoSearchResult(TodoResponse):
+    score: float
+
+
+class TodoSearchPage(BaseModel):
+    todos: list[TodoSearchResult]
+    next_offset: Optional[int]
+
+
+class TodoStatsResponse(BaseModel):
+    total: int
+    complete: int
+    incomplete: int
+    incomplete_by_priority: dict[int, int]
+
+
+class TodoIdsRequest(BaseModel):
+    ids: list[Annotated[int, Field(gt=0)]] = Field(
+        min_length=1, max_length=MAX_BATCH_SIZE
+    )
+
+
+class TodoCompleteBatchRequest(TodoIdsRequest):
+    complete: bool = True
+
+
+async def todos_written(user_id: int) -> None:
+    await read_router.mark_write(user_id)
+
+
+async def get_todos_version(db, user_id: int) -> Optional[int]:
+    return await db.scalar(select(Users.todos_version).where(Users.id == user_id))
+
+
+def todos_etag(user_id: int, version: int, *parts) -> str:
+    return '"' + ".".join(str(part) for part in (user_id, version, *parts)) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+async def check_todos_etag(
+    db, user_id: int, response: Optional[Response], if_none_match, *parts
+) -> Optional[Response]:
+    """
+    Compare If-None-Match against the user's todos version before touching the
+    todos table. Returns a 304 response on a match, otherwise tags `response`.
+    """
+    if response is None:
+        return None
+    version = await get_todos_version(db, user_id)
+    if version is None:
+        return None
+    etag = todos_etag(user_id, version, *parts)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def list_statement(
+    owner_id: int,
+    after: Optional[tuple[int, ...]],
+    complete: Optional[bool],
+    priority_min: Optional[int],
+    priority_max: Optional[int],
+    title_prefix: Optional[str],
+    sort: TodoSort,
+):
+    """
+    The keyset-paginated listing for one owner as a lambda statement.
+
+    Each lambda is cached by its code location, so the few filter and sort
+    combinations are built and compiled once; later requests only swap in
+    their bound values. Every predicate compares a bare column, and each sort
+    order is served by ix_todos_owner_id_id or ix_todos_owner_id_priority_id.
+    """
+    statement = lambda_stmt(
+        lambda: select(Todos.__table__).where(Todos.owner_id == owner_id)
+    )
+    if complete is not None:
+        statement += lambda s: s.where(Todos.complete == complete)
+    if priority_min is not None:
+        statement += lambda s: s.where(Todos.priority >= priority_min)
+    if priority_max is not None:
+        statement += lambda s: s.where(Todos.priority <= priority_max)
+    if title_prefix is not None:
+        pattern = (
+            title_prefix.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%"
+        )
+        statement += lambda s: s.where(Todos.title.like(pattern, escape="/"))
+
+    if after is not None:
+        after_id = after[1]
+        if sort == "id":
+            statement += lambda s: s.where(Todos.id > after_id)
+        elif sort == "-id":
+            statement += lambda s: s.where(Todos.id < after_id)
+        else:
+            after_priority = after[2]
+            if sort == "priority":
+                statement += lambda s: s.where(
+                    tuple_(Todos.priority, Todos.id) > tuple_(after_priority, after_id)
+                )
+            else:
+                statement += lambda s: s.where(
+                    tuple_(Todos.priority, Todos.id) < tuple_(after_priority, after_id)
+                )
+
+    if sort == "id":
+        statement += lambda s: s.order_by(Todos.id)
+    elif sort == "-id":
+        statement += lambda s: s.order_by(Todos.id.desc())
+    elif sort == "priority":
+        statement += lambda s: s.order_by(Todos.priority, Todos.id)
+    else:
+        statement += lambda s: s.order_by(Todos.priority.desc(), Todos.id.desc())
+    return statement
+
+
+@router.get("/api/", status_code=status.HTTP_200_OK, response_model=TodoPage)
+async def read_all(
+    user: user_dependency,
+    db: read_db_dependency,
+    limit: Annotated[int, Query(gt=0, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    complete: Optional[bool] = None,
+    priority_min: Annotated[Optional[int], Query(gt=0, lt=6)] = None,
+    priority_max: Annotated[Optional[int], Query(gt=0, lt=6)] = None,
+    title_prefix: Annotated[Optional[str], Query(min_length=1, max_length=100)] = None,
+    sort: TodoSort = "id",
+    response: Response = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    keys = ("owner_id", "id")
+    if sort.lstrip("-") == "priority":
+        keys += ("priority",)
+    try:
+        after = decode_cursor(cursor, sort, size=len(keys))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if after is not None and after[0] != user.get("id"):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # The title prefix is free text, so the query goes into the ETag hashed.
+    query = repr(
+        (limit, cursor, complete, priority_min, priority_max, title_prefix, sort)
+    )
+    not_modified = await check_todos_etag(
+        db,
+        user.get("id"),
+        response,
+        if_none_match,
+        "page",
+        hashlib.blake2b(query.encode(), digest_size=8).hexdigest(),
+    )
+    if not_modified is not None:
+        return not_modified
+
+    statement = list_statement(
+        user.get("id"),
+        after,
+        complete,
+        priority_min,
+        priority_max,
+        title_prefix,
+        sort,
+    )
+    return await fetch_page(db, statement, limit, sort, keys)
+
+
+@router.get(
+    "/api/todos/search", status_code=status.HTTP_200_OK, response_model=TodoSearchPage
+)
+async def search_todos(
+    user: user_dependency,
+    db: read_db_dependency,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(gt=0, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    offset: Annotated[int, Query(ge=0, le=MAX_SEARCH_OFFSET)] = 0,
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    if not q.split():
+        return {"todos": [], "next_offset": None}
+
+    # Ranked results have no stable keyset to resume from, so search pages
+    # by offset, bounded by MAX_SEARCH_OFFSET.
+    statement = search_statement(db.get_bind().dialect.name, user.get("id"), q)
+    result = await db.execute(statement.limit(limit + 1).offset(offset))
+    todos = result.mappings().all()
+    next_offset = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        next_offset = offset + limit
+    return {"todos": todos, "next_offset": next_offset}
+
+
+@router.get(
+    "/api/todos/stats", status_code=status.HTTP_200_OK, response_model=TodoStatsResponse
+)
+async def read_stats(user: user_dependency, db: read_db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(Todos).filter(Todos.owner_id == user.get("id")).all()
+    # todo_stats is kept current by triggers, so this reads at most a few
+    # rows instead of counting the user's todos.
+    result = await db.execute(user_stats_statement(user.get("id")))
+    return summarize(result.all())
 
 
-@router.get("/api/todo/{todo_id}", status_code=status.HTTP_200_OK)
+@router.get(
+    "/api/todo/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoResponse
+)
 async def read_todo(
-    user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)
+    user: user_dependency,
+    db: read_db_dependency,
+    todo_id: int = Path(gt=0),
+    response: Response = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
 ):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
+    not_modified = await check_todos_etag(
+        db, user.get("id"), response, if_none_match, "todo", todo_id
+    )
+    if not_modified is not None:
+        return not_modified
+
+    result = await db.execute(
+        select(Todos.__table__)
+        .where(Todos.id == todo_id)
+        .where(Todos.owner_id == user.get("id"))
     )
+    todo_model = result.mappings().first()
     if todo_model is not None:
         return todo_model
     raise HTTPException(status_code=404, detail="Todo not found")
@@ -69,7 +339,8 @@ async def create_todo(
         raise HTTPException(status_code=401, detail="Authentication Failed")
     todo_model = Todos(**todo_request.model_dump(), owner_id=user.get("id"))
     db.add(todo_model)
-    db.commit()
+    await db.commit()
+    await todos_written(user.get("id"))
 
 
 @router.put("/api/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -82,21 +353,17 @@ async def update_todo(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
+    result = await db.execute(
+        update(Todos)
+        .where(Todos.id == todo_id)
+        .where(Todos.owner_id == user.get("id"))
+        .values(**todo_request.model_dump())
+        .execution_options(synchronize_session=False)
     )
-    if todo_model is None:
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found")
-    todo_model.title = todo_request.title
-    todo_model.description = todo_request.description
-    todo_model.priority = todo_request.priority
-    todo_model.complete = todo_request.complete
-
-    db.add(todo_model)
-    db.commit()
+    await db.commit()
+    await todos_written(user.get("id"))
 
 
 @router.delete("/api/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -106,35 +373,105 @@ async def delete_todo(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
+    result = await db.execute(
+        delete(Todos)
+        .where(Todos.id == todo_id)
+        .where(Todos.owner_id == user.get("id"))
+        .execution_options(synchronize_session=False)
     )
-    if todo_model is None:
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found")
-    db.query(Todos).filter(Todos.id == todo_id).filter(
-        Todos.owner_id == user.get("id")
-    ).delete()
-    db.commit()
+    await db.commit()
+    await todos_written(user.get("id"))
 
 
-@router.put("/api/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.put("/api/todo/{todo_id}/complete", status_code=status.HTTP_204_NO_CONTENT)
 async def complete_todo(
     user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)
 ):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
 
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
+    result = await db.execute(
+        update(Todos)
+        .where(Todos.id == todo_id)
+        .where(Todos.owner_id == user.get("id"))
+        .values(complete=~Todos.complete)
+        .execution_options(synchronize_session=False)
     )
-    if todo_model is None:
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found")
-    todo_model.complete = not todo_model.complete
-    db.add(todo_model)
-    db.commit()
+    await db.commit()
+    await todos_written(user.get("id"))
+
+
+@router.post("/api/todos/batch", status_code=status.HTTP_201_CREATED)
+async def create_todos(
+    user: user_dependency,
+    db: db_dependency,
+    todo_requests: Annotated[
+        list[TodoRequest], Body(min_length=1, max_length=MAX_BATCH_SIZE)
+    ],
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    ids = await db.scalars(
+        insert(Todos).returning(Todos.id, sort_by_parameter_order=True),
+        [
+            {**todo_request.model_dump(), "owner_id": user.get("id")}
+            for todo_request in todo_requests
+        ],
+    )
+    results = [
+        {"index": index, "id": todo_id, "status": "created"}
+        for index, todo_id in enumerate(ids.all())
+    ]
+    await db.commit()
+    await todos_written(user.get("id"))
+    return results
+
+
+@router.put("/api/todos/batch/complete", status_code=status.HTTP_200_OK)
+async def complete_todos(
+    user: user_dependency, db: db_dependency, batch_request: TodoCompleteBatchRequest
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    updated = await db.scalars(
+        update(Todos)
+        .where(Todos.id.in_(batch_request.ids))
+        .where(Todos.owner_id == user.get("id"))
+        .values(complete=batch_request.complete)
+        .returning(Todos.id)
+        .execution_options(synchronize_session=False)
+    )
+    results = _batch_results(batch_request.ids, set(updated.all()), "updated")
+    await db.commit()
+    await todos_written(user.get("id"))
+    return results
+
+
+@router.post("/api/todos/batch/delete", status_code=status.HTTP_200_OK)
+async def delete_todos(
+    user: user_dependency, db: db_dependency, batch_request: TodoIdsRequest
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    deleted = await db.scalars(
+        delete(Todos)
+        .where(Todos.id.in_(batch_request.ids))
+        .where(Todos.owner_id == user.get("id"))
+        .returning(Todos.id)
+        .execution_options(synchronize_session=False)
+    )
+    results = _batch_results(batch_request.ids, set(deleted.all()), "deleted")
+    await db.commit()
+    await todos_written(user.get("id"))
+    return results
+
+
+def _batch_results(ids: list[int], found: set[int], found_status: str) -> list[dict]:
+    return [
+        {"id": todo_id, "status": found_status if todo_id in found else "not_found"}
+        for todo_id in ids
+    ]
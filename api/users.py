@@ -1,20 +1,35 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import Depends, HTTPException, APIRouter
-from passlib.context import CryptContext
-from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.db import models
-from app.db.database import get_db
-from .auth import get_current_user
+from app.db.database import get_async_db
+from app.hashing import password_hasher
+from app.db.routing import read_router
+from .auth import get_read_db, get_request_user
 
 router = APIRouter(prefix="/api/user", tags=["user"])
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[Optional[dict], Depends(get_request_user)]
+
+
+class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: Optional[str]
+    email: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    role: Optional[str]
+    phone_number: Optional[str]
+    is_active: Optional[bool]
 
 
 class UserVerification(BaseModel):
@@ -22,11 +37,20 @@ class UserVerification(BaseModel):
     new_password: str = Field(min_length=6)
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def get_user(user: user_dependency, db: db_dependency):
+@router.get("/", status_code=status.HTTP_200_OK, response_model=UserResponse)
+async def get_user(user: user_dependency, db: read_db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    return db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    # Only the exposed columns are selected, hashed_password never leaves the DB.
+    result = await db.execute(
+        select(
+            *(getattr(models.Users, field) for field in UserResponse.model_fields)
+        ).where(models.Users.id == user.get("id"))
+    )
+    user_model = result.mappings().first()
+    if user_model is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_model
 
 
 @router.put("/password", status_code=status.HTTP_204_NO_CONTENT)
@@ -35,17 +59,20 @@ async def change_password(
 ):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    user_model = (
-        db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    user_model = await db.scalar(
+        select(models.Users).where(models.Users.id == user.get("id"))
     )
 
-    if not bcrypt_context.verify(
+    if not await password_hasher.verify(
         user_verification.password, user_model.hashed_password
     ):
         raise HTTPException(status_code=401, detail="Error on password change")
-    user_model.hashed_password = bcrypt_context.hash(user_verification.new_password)
+    user_model.hashed_password = await password_hasher.hash(
+        user_verification.new_password
+    )
     db.add(user_model)
-    db.commit()
+    await db.commit()
+    await read_router.mark_write(user.get("id"))
 
 
 @router.put("/phone_number/{phone_number}", status_code=status.HTTP_204_NO_CONTENT)
@@ -54,9 +81,10 @@ async def change_phone_number(
 ):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    user_model = (
-        db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    user_model = await db.scalar(
+        select(models.Users).where(models.Users.id == user.get("id"))
     )
     user_model.phone_number = phone_number
     db.add(user_model)
-    db.commit()
+    await db.commit()
+    await read_router.mark_write(user.get("id"))
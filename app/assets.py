@@ -0,0 +1,170 @@
+"""
+Static asset build: content-hashed copies plus precompressed variants.
+
+    python -m app.assets --source static --output build/static
+
+Every file under --source is written to --output both as-is and as
+`name.<hash>.ext`, with `.gz` (and `.br`, when the optional brotli package is
+installed) next to each compressible file. manifest.json maps the original
+path to the hashed one; AssetFiles serves the hashed names as immutable.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import stat
+from typing import Optional
+
+import anyio
+from dotenv import load_dotenv
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+load_dotenv()
+
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+STATIC_BUILD_DIR = os.getenv("STATIC_BUILD_DIR", "build/static")
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+COMPRESSIBLE = {".css", ".js", ".map", ".svg", ".html", ".json", ".txt"}
+# Preferred first.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def hashed_name(path: str, data: bytes) -> str:
+    stem, suffix = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{suffix}"
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _write_variants(path: str, data: bytes) -> None:
+    _write(path, data)
+    if os.path.splitext(path)[1] not in COMPRESSIBLE:
+        return
+    _write(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(path + ".br", brotli.compress(data))
+
+
+def build(source: str = STATIC_DIR, output: str = STATIC_BUILD_DIR) -> dict:
+    manifest = {}
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(root, name), source)
+            path = path.replace(os.sep, "/")
+            with open(os.path.join(source, path), "rb") as f:
+                data = f.read()
+            manifest[path] = hashed_name(path, data)
+            _write_variants(os.path.join(output, path), data)
+            _write_variants(os.path.join(output, manifest[path]), data)
+    _write(
+        os.path.join(output, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode(),
+    )
+    return manifest
+
+
+def load_manifest(directory: str = STATIC_BUILD_DIR) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# Without a build, assets are served straight from STATIC_DIR, unhashed.
+manifest = load_manifest()
+static_directory = STATIC_BUILD_DIR if manifest else STATIC_DIR
+
+
+def asset_path(path: str) -> str:
+    path = path.lstrip("/")
+    return "/" + manifest.get(path, path)
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    encodings = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        try:
+            if float(params.strip().removeprefix("q=") or 1) == 0:
+                continue
+        except ValueError:
+            pass
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+class AssetFiles(StaticFiles):
+    """
+    StaticFiles that picks a precompressed variant matching Accept-Encoding
+    and marks content-hashed files from `manifest` as immutable.
+    """
+
+    def __init__(self, *, manifest: Optional[dict] = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.hashed = set((manifest or {}).values())
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await self.encoded_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if os.path.splitext(path)[1] in COMPRESSIBLE:
+            response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = (
+            IMMUTABLE if path in self.hashed else "no-cache"
+        )
+        return response
+
+    async def encoded_response(self, path: str, scope: Scope) -> Optional[Response]:
+        if scope["method"] not in ("GET", "HEAD"):
+            return None
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + suffix
+            )
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = self.file_response(full_path, stat_result, scope)
+            response.headers["Content-Encoding"] = encoding
+            if response.status_code == 200:
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                if media_type.startswith("text/"):
+                    media_type += "; charset=utf-8"
+                response.headers["Content-Type"] = media_type
+            return response
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default=STATIC_DIR)
+    parser.add_argument("--output", default=STATIC_BUILD_DIR)
+    args = parser.parse_args()
+
+    built = build(args.source, args.output)
+    for path, hashed in built.items():
+        print(f"{path} -> {hashed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Size-bounded LRU mapping with optional per-entry expiry.
+
+    Expiry times are absolute timestamps on `clock` (wall-clock seconds by
+    default, which is what JWT `exp` claims use). A `maxsize` of 0 disables
+    the cache: every lookup is a miss and nothing is stored.
+    """
+
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.time) -> None:
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value, expires_at = self._entries.get(key, (_MISSING, None))
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(
+        self, key: Hashable, value: Any, expires_at: Optional[float] = None
+    ) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value, _ = self._entries.pop(key, (default, None))
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class FragmentCache:
+    """
+    Rendered HTML fragments grouped by owner, on top of an `LRUCache`.
+
+    Keys carry a version of the owner's data that the database bumps on every
+    write (users.todos_version for todos), so a write made by any worker
+    process moves readers to a new key and the old entries are never hit
+    again; they age out of the LRU or expire after `ttl` seconds. Read the
+    version before the data a fragment is rendered from, so a write that
+    lands mid-render is never cached under its own version.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.entries = LRUCache(maxsize, clock=clock)
+        self.ttl = ttl
+        self.clock = clock
+        self.renders = 0
+        self.render_seconds = 0.0
+
+    def key(self, owner: Hashable, version: Hashable, *parts: Hashable) -> tuple:
+        return owner, version, *parts
+
+    def get(self, key: tuple) -> Optional[str]:
+        return self.entries.get(key)
+
+    def set(self, key: tuple, html: str) -> None:
+        expires_at = None if self.ttl is None else self.clock() + self.ttl
+        self.entries.set(key, html, expires_at=expires_at)
+
+    def render(self, template, context: dict) -> str:
+        started = time.perf_counter()
+        html = template.render(context)
+        self.renders += 1
+        self.render_seconds += time.perf_counter() - started
+        return html
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            **self.entries.stats(),
+            "ttl": self.ttl,
+            "renders": self.renders,
+            "avg_render_ms": self.render_seconds / (self.renders or 1) * 1000,
+        }
@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import (
+    DDL,
+    Column,
+    Integer,
+    String,
+    Boolean,
+    ForeignKey,
+    Index,
+    event,
+)
 
 from app.db.database import Base
 
@@ -15,6 +24,8 @@ class Users(Base):
     is_active = Column(Boolean, default=True)
     role = Column(String)
     phone_number = Column(String)
+    # Bumped by the todos triggers below on every write to the user's todos.
+    todos_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class Todos(Base):
@@ -26,3 +37,268 @@ class Todos(Base):
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id"))
+
+    __table_args__ = (
+        Index("ix_todos_owner_id_id", "owner_id", "id"),
+        Index("ix_todos_owner_id_priority_id", "owner_id", "priority", "id"),
+    )
+
+
+class TodoStats(Base):
+    """
+    Number of todos per (owner, priority, complete), kept current by the
+    todos triggers below. A NULL priority is counted as 0 and a NULL
+    complete as false; todos without an owner are not counted.
+    """
+
+    __tablename__ = "todo_stats"
+
+    owner_id = Column(Integer, primary_key=True)
+    priority = Column(Integer, primary_key=True)
+    complete = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+# Every insert/update/delete on todos bumps the owner's users.todos_version in
+# the same transaction, which is what the todo read endpoints use as ETag.
+# Keep in sync with Alembic revision 8d3e51c0a2f7.
+for trigger_ddl in (
+    """
+    CREATE TRIGGER todos_version_insert AFTER INSERT ON todos
+    BEGIN
+        UPDATE users SET todos_version = todos_version + 1 WHERE id = NEW.owner_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todos_version_update AFTER UPDATE ON todos
+    BEGIN
+        UPDATE users SET todos_version = todos_version + 1
+        WHERE id IN (OLD.owner_id, NEW.owner_id);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_version_delete AFTER DELETE ON todos
+    BEGIN
+        UPDATE users SET todos_version = todos_version + 1 WHERE id = OLD.owner_id;
+    END
+    """,
+):
+    event.listen(
+        Todos.__table__, "after_create", DDL(trigger_ddl).execute_if(dialect="sqlite")
+    )
+
+# Postgres bumps once per statement from its transition tables, so a batch
+# of 500 todos updates its owner's row once rather than 500 times. A trigger
+# with transition tables takes a single event, hence one per operation.
+for trigger_ddl in (
+    """
+    CREATE FUNCTION bump_todos_version() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE users SET todos_version = todos_version + 1
+            WHERE id IN (SELECT owner_id FROM new_todos);
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE users SET todos_version = todos_version + 1
+            WHERE id IN (SELECT owner_id FROM old_todos);
+        ELSE
+            UPDATE users SET todos_version = todos_version + 1
+            WHERE id IN (
+                SELECT owner_id FROM old_todos UNION SELECT owner_id FROM new_todos
+            );
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER todos_version_insert AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_todos_version()
+    """,
+    """
+    CREATE TRIGGER todos_version_update AFTER UPDATE ON todos
+    REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_todos_version()
+    """,
+    """
+    CREATE TRIGGER todos_version_delete AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_todos_version()
+    """,
+):
+    event.listen(
+        Todos.__table__,
+        "after_create",
+        DDL(trigger_ddl).execute_if(dialect="postgresql"),
+    )
+
+# Full-text search, see app.db.search.
+for search_ddl in (
+    """
+    CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos
+    BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (NEW.id, NEW.title, NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description ON todos
+    BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (NEW.id, NEW.title, NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos
+    BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+    END
+    """,
+):
+    event.listen(
+        Todos.__table__, "after_create", DDL(search_ddl).execute_if(dialect="sqlite")
+    )
+event.listen(
+    Todos.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS todos_fts").execute_if(dialect="sqlite"),
+)
+
+# Keep in sync with Alembic revision c4f2a81e6d90.
+for search_ddl in (
+    """
+    ALTER TABLE todos ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX ix_todos_search_vector ON todos USING gin (search_vector)",
+):
+    event.listen(
+        Todos.__table__,
+        "after_create",
+        DDL(search_ddl).execute_if(dialect="postgresql"),
+    )
+
+# Every write to todos moves its counts in todo_stats, see TodoStats. The
+# repair job in app.db.stats rebuilds the table if it ever drifts.
+# Postgres aggregates each statement's transition tables into one upsert per
+# (owner, priority, complete) and fires same-event triggers in name order:
+# todos_write_stats_* sorts after todos_version_*, so every write locks the
+# owner's users row before any todo_stats row and concurrent writes by one
+# user cannot deadlock on them.
+# Keep in sync with Alembic revision e93b0d5c7f18.
+for stats_ddl in (
+    """
+    CREATE TRIGGER todo_stats_insert AFTER INSERT ON todos
+    WHEN NEW.owner_id IS NOT NULL
+    BEGIN
+        INSERT INTO todo_stats (owner_id, priority, complete, count)
+        VALUES (NEW.owner_id, coalesce(NEW.priority, 0), coalesce(NEW.complete, 0), 1)
+        ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_stats_update
+    AFTER UPDATE OF owner_id, priority, complete ON todos
+    BEGIN
+        UPDATE todo_stats SET count = count - 1
+        WHERE owner_id = OLD.owner_id
+            AND priority = coalesce(OLD.priority, 0)
+            AND complete = coalesce(OLD.complete, 0);
+        INSERT INTO todo_stats (owner_id, priority, complete, count)
+        SELECT NEW.owner_id, coalesce(NEW.priority, 0), coalesce(NEW.complete, 0), 1
+        WHERE NEW.owner_id IS NOT NULL
+        ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_stats_delete AFTER DELETE ON todos
+    BEGIN
+        UPDATE todo_stats SET count = count - 1
+        WHERE owner_id = OLD.owner_id
+            AND priority = coalesce(OLD.priority, 0)
+            AND complete = coalesce(OLD.complete, 0);
+    END
+    """,
+):
+    event.listen(
+        Todos.__table__, "after_create", DDL(stats_ddl).execute_if(dialect="sqlite")
+    )
+
+for stats_ddl in (
+    """
+    CREATE FUNCTION count_todo_stats() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO todo_stats (owner_id, priority, complete, count)
+            SELECT owner_id, coalesce(priority, 0), coalesce(complete, false), count(*)
+            FROM new_todos
+            WHERE owner_id IS NOT NULL
+            GROUP BY 1, 2, 3
+            ON CONFLICT (owner_id, priority, complete)
+            DO UPDATE SET count = todo_stats.count + excluded.count;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE todo_stats SET count = todo_stats.count - deleted.count
+            FROM (
+                SELECT owner_id, coalesce(priority, 0) AS priority,
+                    coalesce(complete, false) AS complete, count(*) AS count
+                FROM old_todos
+                WHERE owner_id IS NOT NULL
+                GROUP BY 1, 2, 3
+            ) AS deleted
+            WHERE todo_stats.owner_id = deleted.owner_id
+                AND todo_stats.priority = deleted.priority
+                AND todo_stats.complete = deleted.complete;
+        ELSE
+            -- Net change per key; updates that move no count write nothing.
+            INSERT INTO todo_stats (owner_id, priority, complete, count)
+            SELECT owner_id, priority, complete, sum(delta)
+            FROM (
+                SELECT owner_id, coalesce(priority, 0) AS priority,
+                    coalesce(complete, false) AS complete, 1 AS delta
+                FROM new_todos
+                UNION ALL
+                SELECT owner_id, coalesce(priority, 0), coalesce(complete, false), -1
+                FROM old_todos
+            ) AS changes
+            WHERE owner_id IS NOT NULL
+            GROUP BY 1, 2, 3
+            HAVING sum(delta) <> 0
+            ON CONFLICT (owner_id, priority, complete)
+            DO UPDATE SET count = todo_stats.count + excluded.count;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER todos_write_stats_insert AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION count_todo_stats()
+    """,
+    """
+    CREATE TRIGGER todos_write_stats_update AFTER UPDATE ON todos
+    REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION count_todo_stats()
+    """,
+    """
+    CREATE TRIGGER todos_write_stats_delete AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION count_todo_stats()
+    """,
+):
+    event.listen(
+        Todos.__table__,
+        "after_create",
+        DDL(stats_ddl).execute_if(dialect="postgresql"),
+    )
@@ -0,0 +1,70 @@
+import base64
+import json
+from typing import Optional, Sequence
+
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort: str, *keys: int) -> str:
+    """
+    Opaque keyset cursor holding the sort order of a listing and the key
+    columns of the last row of its page, e.g. `(owner_id, id)` for one
+    owner's listing.
+    """
+    raw = json.dumps([sort, *keys], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(
+    cursor: Optional[str], sort: str, size: int = 2
+) -> Optional[tuple[int, ...]]:
+    """
+    The key values of a cursor, which must come from a listing in the same
+    `sort` order: keys from another order would point at the wrong page.
+    """
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if (
+        not isinstance(values, list)
+        or len(values) != size + 1
+        or values[0] != sort
+        or not all(type(value) is int for value in values[1:])
+    ):
+        raise ValueError("Invalid cursor")
+    return tuple(values[1:])
+
+
+async def fetch_page(
+    db,
+    statement,
+    limit: int,
+    sort: str = "id",
+    keys: Sequence[str] = ("owner_id", "id"),
+) -> dict:
+    """
+    Run a keyset-ordered todo statement and cut one page out of it.
+
+    One extra row is fetched to learn whether another page exists, so the
+    statement must already be ordered on the columns named in `keys` and
+    filtered past the previous cursor, which holds `sort` and their values. Rows come back as plain mappings, no
+    ORM instances are built for list responses.
+    """
+    size = limit + 1
+    if isinstance(statement, StatementLambdaElement):
+        statement = statement + (lambda s: s.limit(size))
+    else:
+        statement = statement.limit(size)
+    todos = (await db.execute(statement)).mappings().all()
+    next_cursor = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        next_cursor = encode_cursor(sort, *(todos[-1][key] for key in keys))
+    return {"todos": todos, "next_cursor": next_cursor}
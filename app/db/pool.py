@@ -0,0 +1,103 @@
+import time
+from typing import Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool, QueuePool
+
+
+class _TimedConnect:
+    """Pool mixin that reports how long each checkout took to `metrics`."""
+
+    metrics: "PoolMetrics"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - started)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class PoolMetrics:
+    """
+    Connection pool instrumentation for one engine.
+
+    Checkout wait is timed by the pool class from `poolclass()`, which keeps
+    working across `engine.dispose()` since the pool is recreated from the
+    same class. Everything else comes from pool events registered by
+    `attach()`.
+    """
+
+    def __init__(self) -> None:
+        self.engine = None
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def poolclass(self, base: type[Pool]) -> type[Pool]:
+        return type(f"Timed{base.__name__}", (_TimedConnect, base), {"metrics": self})
+
+    def attach(self, engine) -> None:
+        self.engine = engine
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    @property
+    def pool(self) -> Optional[QueuePool]:
+        pool = self.engine.pool if self.engine is not None else None
+        return pool if isinstance(pool, QueuePool) else None
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_timeout(self, seconds: float) -> None:
+        self.timeouts += 1
+        self.record_wait(seconds)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        if self.pool is not None:
+            self.peak_checked_out = max(self.peak_checked_out, self.pool.checkedout())
+            self.peak_overflow = max(self.peak_overflow, self.pool.overflow())
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        pool = self.pool
+        attempts = self.checkouts + self.timeouts
+        return {
+            "size": pool.size() if pool else None,
+            "max_overflow": pool._max_overflow if pool else None,
+            "timeout": pool.timeout() if pool else None,
+            "checked_out": pool.checkedout() if pool else None,
+            "checked_in": pool.checkedin() if pool else None,
+            "overflow": max(0, pool.overflow()) if pool else None,
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": max(0, self.peak_overflow),
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": self.wait_seconds / (attempts or 1) * 1000,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
@@ -0,0 +1,142 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import LRUCache
+from app.db.database import ReplicaSessionLocal
+from app.shared_store import SQLiteStore, make_backend
+
+load_dotenv()
+
+# How long a user's reads stay on the primary after their own write; should
+# comfortably exceed the replica's replication lag.
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+REPLICA_STICKY_USERS = int(os.getenv("REPLICA_STICKY_USERS", 10_000))
+# A backend spec, see app.shared_store. With several workers only a shared
+# file keeps reads after a write on the primary when the next request lands
+# on another worker.
+REPLICA_STICKY_BACKEND = os.getenv("REPLICA_STICKY_BACKEND", "memory")
+
+
+class MemoryBackend:
+    """Recent writers of this worker process only."""
+
+    def __init__(
+        self, maxsize: int = REPLICA_STICKY_USERS, clock: Callable = time.time
+    ) -> None:
+        self.writers = LRUCache(maxsize, clock=clock)
+
+    async def mark(self, user_id: int, until: float) -> None:
+        self.writers.set(user_id, True, expires_at=until)
+
+    async def recent(self, user_id: int) -> bool:
+        return self.writers.get(user_id, False)
+
+
+class SQLiteBackend(SQLiteStore):
+    """Recent writers in a SQLite file every worker on the host can see."""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS recent_writers"
+        " (user_id INTEGER PRIMARY KEY, until REAL NOT NULL)"
+    )
+
+    def prune(self, now: float) -> None:
+        self.connection.execute("DELETE FROM recent_writers WHERE until < ?", (now,))
+
+    def _mark(self, user_id: int, until: float) -> None:
+        with self.transaction() as connection:
+            connection.execute(
+                "INSERT INTO recent_writers (user_id, until) VALUES (?, ?)"
+                " ON CONFLICT (user_id) DO UPDATE"
+                " SET until = max(until, excluded.until)",
+                (user_id, until),
+            )
+
+    def _recent(self, user_id: int) -> bool:
+        row = self.fetchone(
+            "SELECT until FROM recent_writers WHERE user_id = ?", (user_id,)
+        )
+        return row is not None and row[0] > self.clock()
+
+    async def mark(self, user_id: int, until: float) -> None:
+        await run_in_threadpool(self._mark, user_id, until)
+
+    async def recent(self, user_id: int) -> bool:
+        return await run_in_threadpool(self._recent, user_id)
+
+
+class ReadRouter:
+    """
+    Sends read-only sessions to a replica, except for users who wrote within
+    the last `window` seconds, whose reads stay on the primary so they see
+    their own writes.
+
+    Recent writers are kept in `backend` (see app.shared_store):
+    MemoryBackend only covers the worker that handled the write,
+    SQLiteBackend every worker on the host, and anything with async
+    `mark(user_id, until)` and `recent(user_id)` can take their place.
+    """
+
+    def __init__(
+        self,
+        replica_factory: Optional[Callable] = None,
+        window: float = REPLICA_STICKY_SECONDS,
+        backend=None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.replica_factory = replica_factory
+        self.window = window
+        self.clock = clock
+        self.backend = backend if backend is not None else MemoryBackend(clock=clock)
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+
+    async def mark_write(self, user_id: Optional[int]) -> None:
+        # Without a replica every read is on the primary already.
+        if user_id is None or self.window <= 0 or self.replica_factory is None:
+            return
+        await self.backend.mark(user_id, self.clock() + self.window)
+
+    async def use_replica(self, user_id: Optional[int]) -> bool:
+        if self.replica_factory is None:
+            return False
+        if user_id is not None and await self.backend.recent(user_id):
+            self.sticky_reads += 1
+            return False
+        return True
+
+    @asynccontextmanager
+    async def session(self, user_id: Optional[int], primary):
+        if not await self.use_replica(user_id):
+            self.primary_reads += 1
+            yield primary
+            return
+        self.replica_reads += 1
+        async with self.replica_factory() as db:
+            yield db
+
+    def stats(self) -> dict:
+        return {
+            "replica": self.replica_factory is not None,
+            "window_seconds": self.window,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "backend": type(self.backend).__name__,
+        }
+
+
+read_router = ReadRouter(
+    ReplicaSessionLocal,
+    backend=(
+        make_backend(REPLICA_STICKY_BACKEND, MemoryBackend, SQLiteBackend)
+        if ReplicaSessionLocal is not None
+        else None
+    ),
+)
@@ -0,0 +1,48 @@
+"""
+Full-text search over todo titles and descriptions.
+
+Postgres matches against todos.search_vector, a stored generated tsvector
+(title weighted above description) with a GIN index, added by Alembic
+revision c4f2a81e6d90. SQLite, which the tests run on, keeps an external
+content FTS5 table, todos_fts, in sync with triggers. Both are created next
+to the other todos triggers in app.db.models, and neither is mapped on
+Todos, so the regular todo queries never load them.
+
+Both backends stem English words and require every search term to match.
+Results come with a `score`, higher is better.
+"""
+
+from sqlalchemy import column, desc, func, literal_column, select, table
+
+from app.db.models import Todos
+
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+search_vector = literal_column("todos.search_vector")
+
+todos_fts = table("todos_fts", column("rowid"))
+
+
+def fts5_query(q: str) -> str:
+    """
+    FTS5 MATCH expression requiring every word of `q`. Each word is quoted,
+    so operators and punctuation in user input are searched for literally
+    instead of being parsed as query syntax.
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def search_statement(dialect: str, owner_id: int, q: str):
+    """Todos of `owner_id` matching `q`, best match first, then by id."""
+    if dialect == "postgresql":
+        query = func.plainto_tsquery(SEARCH_CONFIG, q)
+        score = func.ts_rank_cd(search_vector, query).label("score")
+        statement = select(Todos.__table__, score).where(search_vector.op("@@")(query))
+    else:
+        # bm25() is lower for better matches; the weights favour the title.
+        score = (-func.bm25(literal_column("todos_fts"), 2.0, 1.0)).label("score")
+        statement = (
+            select(Todos.__table__, score)
+            .join_from(Todos.__table__, todos_fts, todos_fts.c.rowid == Todos.id)
+            .where(literal_column("todos_fts").op("MATCH")(fts5_query(q)))
+        )
+    return statement.where(Todos.owner_id == owner_id).order_by(desc("score"), Todos.id)
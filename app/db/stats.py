@@ -0,0 +1,138 @@
+"""
+Per-user todo counts and their repair job.
+
+    python -m app.db.stats [--dry-run]
+
+todo_stats is maintained by triggers on todos (see TodoStats), so every
+write path, including batch endpoints and admin deletes, keeps it current
+without the handlers doing anything. The job recomputes the counts from the
+todos table, prints every (owner, priority, complete) whose stored count
+drifted, and, unless --dry-run is given, rewrites todo_stats to match.
+"""
+
+import argparse
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select, text
+
+from app.db.database import engine
+from app.db.models import TodoStats, Todos
+
+
+def user_stats_statement(owner_id: int):
+    return select(TodoStats.priority, TodoStats.complete, TodoStats.count).where(
+        TodoStats.owner_id == owner_id, TodoStats.count > 0
+    )
+
+
+def all_stats_statement():
+    return (
+        select(TodoStats.priority, TodoStats.complete, func.sum(TodoStats.count))
+        .where(TodoStats.count > 0)
+        .group_by(TodoStats.priority, TodoStats.complete)
+    )
+
+
+def all_owners_statement():
+    return select(func.count(TodoStats.owner_id.distinct())).where(TodoStats.count > 0)
+
+
+def summarize(rows: Iterable) -> dict:
+    """Fold (priority, complete, count) rows into the stats response."""
+    summary = {"total": 0, "complete": 0, "incomplete": 0}
+    incomplete_by_priority = {}
+    for priority, complete, count in rows:
+        summary["total"] += count
+        if complete:
+            summary["complete"] += count
+        else:
+            summary["incomplete"] += count
+            incomplete_by_priority[priority] = (
+                incomplete_by_priority.get(priority, 0) + count
+            )
+    summary["incomplete_by_priority"] = dict(sorted(incomplete_by_priority.items()))
+    return summary
+
+
+def expected_counts_statement():
+    priority = func.coalesce(Todos.priority, 0)
+    complete = func.coalesce(Todos.complete, False)
+    return (
+        select(Todos.owner_id, priority, complete, func.count())
+        .where(Todos.owner_id.is_not(None))
+        .group_by(Todos.owner_id, priority, complete)
+    )
+
+
+def drift(connection) -> list[dict]:
+    """Every key whose stored count differs from a full recount."""
+    expected = {
+        (owner_id, priority, bool(complete)): count
+        for owner_id, priority, complete, count in connection.execute(
+            expected_counts_statement()
+        )
+    }
+    stored = {
+        (owner_id, priority, bool(complete)): count
+        for owner_id, priority, complete, count in connection.execute(
+            select(
+                TodoStats.owner_id,
+                TodoStats.priority,
+                TodoStats.complete,
+                TodoStats.count,
+            )
+        )
+    }
+    return [
+        {
+            "owner_id": key[0],
+            "priority": key[1],
+            "complete": key[2],
+            "expected": expected.get(key, 0),
+            "stored": stored.get(key, 0),
+        }
+        for key in sorted(expected.keys() | stored.keys())
+        if expected.get(key, 0) != stored.get(key, 0)
+    ]
+
+
+def repair(bind=engine, dry_run: bool = False) -> list[dict]:
+    """
+    Rebuild todo_stats from todos and return the drift found. Writes to
+    todos are blocked for the duration, so no trigger update is lost.
+    """
+    with bind.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("LOCK TABLE todos IN SHARE MODE"))
+        found = drift(connection)
+        if found and not dry_run:
+            connection.execute(delete(TodoStats))
+            connection.execute(
+                insert(TodoStats).from_select(
+                    ["owner_id", "priority", "complete", "count"],
+                    expected_counts_statement(),
+                )
+            )
+    return found
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--dry-run", action="store_true", help="report drift without repairing it"
+    )
+    args = parser.parse_args(argv)
+
+    found = repair(dry_run=args.dry_run)
+    for row in found:
+        print(
+            f"owner {row['owner_id']} priority {row['priority']}"
+            f" complete {row['complete']}: stored {row['stored']},"
+            f" expected {row['expected']}"
+        )
+    action = "found" if args.dry_run else "repaired"
+    print(f"{len(found)} drifted counts {action}")
+
+
+if __name__ == "__main__":
+    main()
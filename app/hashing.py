@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# bcrypt releases the GIL, so threads already hash in parallel; a process pool
+# additionally keeps the passlib bookkeeping off the worker's interpreter.
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+@functools.cache
+def get_bcrypt_context():
+    # passlib is imported on first use to keep it out of worker boot.
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def __getattr__(name: str):
+    if name == "bcrypt_context":
+        return get_bcrypt_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _timed(fn, *args):
+    return time.monotonic(), fn(*args)
+
+
+def _hash(password: str) -> str:
+    return get_bcrypt_context().hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return get_bcrypt_context().verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hash/verify on a bounded executor so the CPU-heavy work never
+    blocks the event loop.
+
+    At most `workers` operations run at once; anything above that waits in
+    the executor queue, whose depth is tracked for `stats()`.
+    """
+
+    def __init__(self, executor: str = "thread", workers: int = 1) -> None:
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown hash executor: {executor}")
+        self.executor_kind = executor
+        self.workers = workers
+        self._executor = None
+        self.pending = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = (
+                ProcessPoolExecutor
+                if self.executor_kind == "process"
+                else ThreadPoolExecutor
+            )
+            self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.pending - self.workers)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, password, hashed_password)
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        self.pending += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            started, result = await loop.run_in_executor(
+                self.executor, _timed, fn, *args
+            )
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.wait_seconds += started - submitted
+        self.run_seconds += time.monotonic() - started
+        return result
+
+    def stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "in_flight": min(self.pending, self.workers),
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "completed": self.completed,
+            "avg_wait_ms": self.wait_seconds / completed * 1000,
+            "avg_run_ms": self.run_seconds / completed * 1000,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(HASH_EXECUTOR, HASH_WORKERS)
@@ -0,0 +1,210 @@
+"""
+Request and SQL metrics in the Prometheus text exposition format.
+
+Series are keyed by route template (`/api/todo/{todo_id}`), never by raw
+path. Histograms use fixed buckets counted on observe, so recording a request
+costs a few dict lookups and integer increments.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+AUTH_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+# [statement count, ASGI scope, registry] of the request being served. The
+# router fills in scope["route"] before the endpoint runs any query.
+_request_queries: ContextVar[Optional[list]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.requests: dict[tuple, int] = {}
+        self.latency: dict[tuple, Histogram] = {}
+        self.queries: dict[str, int] = {}
+        self.query_latency: dict[str, Histogram] = {}
+        self.queries_per_request: dict[str, Histogram] = {}
+        self.auth_latency: dict[str, Histogram] = {}
+
+    def record_auth(self, source: str, seconds: float) -> None:
+        histogram = self.auth_latency.get(source)
+        if histogram is None:
+            histogram = self.auth_latency[source] = Histogram(AUTH_BUCKETS)
+        histogram.observe(seconds)
+
+    def record_query(self, route: str, seconds: float) -> None:
+        self.queries[route] = self.queries.get(route, 0) + 1
+        histogram = self.query_latency.get(route)
+        if histogram is None:
+            histogram = self.query_latency[route] = Histogram(QUERY_BUCKETS)
+        histogram.observe(seconds)
+
+    def record_request(
+        self, method: str, route: str, status: int, seconds: float, queries: int
+    ) -> None:
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+        histogram = self.queries_per_request.get(route)
+        if histogram is None:
+            histogram = self.queries_per_request[route] = Histogram(QUERY_COUNT_BUCKETS)
+        histogram.observe(queries)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_total Requests by method, route template and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(
+                f'http_requests_total{{method="{method}",route="{_escape(route)}",'
+                f'status="{status}"}} {count}'
+            )
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.latency.items()):
+            lines += histogram.render(
+                "http_request_duration_seconds",
+                f'method="{method}",route="{_escape(route)}"',
+            )
+        lines += [
+            "# HELP db_queries_total SQL statements executed, by route template.",
+            "# TYPE db_queries_total counter",
+        ]
+        for route, count in sorted(self.queries.items()):
+            lines.append(f'db_queries_total{{route="{_escape(route)}"}} {count}')
+        lines += [
+            "# HELP db_queries_per_request SQL statements per request.",
+            "# TYPE db_queries_per_request histogram",
+        ]
+        for route, histogram in sorted(self.queries_per_request.items()):
+            lines += histogram.render(
+                "db_queries_per_request", f'route="{_escape(route)}"'
+            )
+        lines += [
+            "# HELP db_query_duration_seconds SQL statement latency.",
+            "# TYPE db_query_duration_seconds histogram",
+        ]
+        for route, histogram in sorted(self.query_latency.items()):
+            lines += histogram.render(
+                "db_query_duration_seconds", f'route="{_escape(route)}"'
+            )
+        lines += [
+            "# HELP auth_duration_seconds Time to resolve the request user, by"
+            " credential source.",
+            "# TYPE auth_duration_seconds histogram",
+        ]
+        for source, histogram in sorted(self.auth_latency.items()):
+            lines += histogram.render("auth_duration_seconds", f'source="{source}"')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_queries.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _request_queries.get()
+    if queries is None:
+        return
+    queries[0] += 1
+    queries[2].record_query(
+        route_template(queries[1]), time.perf_counter() - context._metrics_started
+    )
+
+
+def instrument_engine(engine) -> None:
+    """Attribute the statements `engine` (a sync Engine) runs to the request."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounted apps (static files) match without setting a route.
+    if scope.get("endpoint") is not None:
+        return scope.get("root_path") or "/"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = registry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        queries = [0, scope, self.registry]
+        token = _request_queries.set(queries)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_queries.reset(token)
+            self.registry.record_request(
+                scope["method"],
+                route_template(scope),
+                status,
+                time.perf_counter() - started,
+                queries[0],
+            )
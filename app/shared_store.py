@@ -0,0 +1,66 @@
+"""
+Worker state that can be kept per process or shared by every worker on the
+host.
+
+The login throttle (app.throttle) and the read router (app.db.routing) each
+have a MemoryBackend private to the worker process and a SQLiteBackend built
+on SQLiteStore, whose file every worker on the host opens. A backend spec is
+"memory" or the path of that file.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+
+class SQLiteStore:
+    """
+    A SQLite file shared by the workers on one host. Subclasses create their
+    table with `SCHEMA`, write inside `transaction()` and drop stale rows in
+    `prune()`, which runs every `PRUNE_EVERY` transactions. Uses wall-clock
+    time, which unlike the monotonic clock is comparable between processes.
+    """
+
+    SCHEMA = ""
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, clock: Callable = time.time) -> None:
+        self.clock = clock
+        self.connection = sqlite3.connect(
+            path, timeout=1.0, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(self.SCHEMA)
+        self.transactions = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self):
+        """One IMMEDIATE transaction, so concurrent workers never interleave."""
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+                self.transactions += 1
+                if self.transactions % self.PRUNE_EVERY == 0:
+                    self.prune(self.clock())
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def fetchone(self, statement: str, parameters: tuple = ()):
+        with self._lock:
+            return self.connection.execute(statement, parameters).fetchone()
+
+    def prune(self, now: float) -> None:
+        pass
+
+
+def make_backend(spec: str, memory: Callable, sqlite: Callable):
+    """`memory()` for "memory", otherwise `sqlite(path)` on the spec's file."""
+    if spec == "memory":
+        return memory()
+    return sqlite(spec)
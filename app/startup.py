@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import async_engine, engine
+from app.db.models import Base
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_CONFIG = os.getenv("ALEMBIC_CONFIG", "alembic.ini")
+# Connections opened (and returned to the pool) before the first request.
+POOL_WARMUP = int(os.getenv("POOL_WARMUP", 2))
+# A warning is logged when startup takes longer than this.
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", 2000))
+
+
+class StartupTimer:
+    """Wall-clock duration of each named startup phase, in run order."""
+
+    def __init__(self, started: Optional[float] = None) -> None:
+        self.started = time.perf_counter() if started is None else started
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - started) * 1000
+
+    def report(self) -> dict:
+        return {
+            "phases_ms": dict(self.phases),
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "budget_ms": STARTUP_BUDGET_MS,
+        }
+
+
+def alembic_script():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    if not os.path.exists(ALEMBIC_CONFIG):
+        return None
+    return ScriptDirectory.from_config(Config(ALEMBIC_CONFIG))
+
+
+def alembic_head() -> Optional[str]:
+    script = alembic_script()
+    return script.get_current_head() if script is not None else None
+
+
+def ensure_schema(bind=engine) -> bool:
+    """
+    Create the tables on a database Alembic has never touched and stamp it
+    at head, so later boots and upgrades treat it as migrated. A migrated
+    database is left to Alembic: creating tables there would add the new
+    ones without their triggers or backfill, and break the next upgrade.
+    Returns whether create_all ran.
+    """
+    from alembic.runtime.migration import MigrationContext
+
+    script = alembic_script()
+    head = script.get_current_head() if script is not None else None
+    with bind.begin() as connection:
+        context = MigrationContext.configure(connection)
+        current = context.get_current_revision()
+        if current is None:
+            Base.metadata.create_all(bind=connection)
+            if head is not None:
+                context.stamp(script, head)
+            return True
+    if head is not None and current != head:
+        logger.error(
+            "database is at revision %s but the code expects %s;"
+            " run `alembic upgrade head`",
+            current,
+            head,
+        )
+    return False
+
+
+async def warm_pool(connections: int = POOL_WARMUP) -> None:
+    async def ping():
+        if async_engine is not None:
+            async with async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        else:
+
+            def sync_ping():
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+
+            await run_in_threadpool(sync_ping)
+
+    # Concurrent, so each ping checks out its own connection.
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+def log_report(report: dict) -> None:
+    phases = ", ".join(
+        f"{name} {ms:.1f} ms" for name, ms in report["phases_ms"].items()
+    )
+    logger.info("startup took %.1f ms (%s)", report["total_ms"], phases)
+    if report["total_ms"] > report["budget_ms"]:
+        logger.warning(
+            "startup took %.1f ms, over the %.0f ms budget",
+            report["total_ms"],
+            report["budget_ms"],
+        )
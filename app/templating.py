@@ -0,0 +1,54 @@
+import os
+
+from dotenv import load_dotenv
+from fastapi.templating import Jinja2Templates
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    pass_context,
+)
+
+from app.assets import asset_path
+
+load_dotenv()
+
+TEMPLATES_DIR = os.getenv("TEMPLATES_DIR", "templates")
+# Only useful while editing templates; in production every template is
+# compiled once at startup and never stat()ed again.
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() == "true"
+# Compiled bytecode survives worker restarts here; None picks a per-user
+# directory under the system temp dir.
+TEMPLATES_CACHE_DIR = os.getenv("TEMPLATES_CACHE_DIR")
+
+if TEMPLATES_CACHE_DIR:
+    os.makedirs(TEMPLATES_CACHE_DIR, exist_ok=True)
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATES_AUTO_RELOAD,
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATES_CACHE_DIR),
+)
+
+
+@pass_context
+def static_url(context: dict, path: str) -> str:
+    """URL of a static asset, content-hashed when a build manifest exists."""
+    return str(context["request"].url_for("static", path=asset_path(path)))
+
+
+env.globals["static_url"] = static_url
+
+templates = Jinja2Templates(env=env)
+
+
+def precompile_templates() -> list[str]:
+    """
+    Load every template so the first request on a fresh worker does not pay
+    for parsing and compiling it.
+    """
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return names
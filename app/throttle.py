@@ -0,0 +1,166 @@
+"""
+Token-bucket throttling of login attempts.
+
+Every key (a client IP or a username) owns a bucket of `burst` tokens that
+refills at `rate` tokens per second; an attempt takes one token or is
+rejected. The check runs before the user lookup and the bcrypt verify, so a
+rejected attempt costs a dict lookup (or one local SQLite transaction) instead
+of a hash.
+
+Buckets live in a backend (see app.shared_store). MemoryBackend is private to
+the worker process; SQLiteBackend keeps them in a file that every worker on
+the host can share. Anything with an async `take(key, rate, burst)` works as
+a backend.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import LRUCache
+from app.shared_store import SQLiteStore, make_backend
+
+load_dotenv()
+
+# A backend spec, see app.shared_store.
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+# A burst of 0 turns that half of the throttle off.
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 30))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", 30))
+LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST", 10))
+LOGIN_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", 5))
+# Buckets kept by the memory backend; the least recently used start over full.
+LOGIN_THROTTLE_KEYS = int(os.getenv("LOGIN_THROTTLE_KEYS", 100_000))
+
+
+def _take(
+    tokens: float, updated: float, now: float, rate: float, burst: int
+) -> tuple[float, float]:
+    """Refill a bucket up to `now` and take one token: (tokens left, wait)."""
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBackend:
+    def __init__(
+        self, maxsize: int = LOGIN_THROTTLE_KEYS, clock: Callable = time.monotonic
+    ) -> None:
+        self.buckets = LRUCache(maxsize)
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens, wait = _take(tokens, updated, now, rate, burst)
+            self.buckets.set(key, (tokens, now))
+        return wait
+
+
+class SQLiteBackend(SQLiteStore):
+    """
+    Buckets in a SQLite file. Each take is one IMMEDIATE transaction, so
+    concurrent workers never hand out the same token.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS login_buckets"
+        " (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+    )
+    # Idle buckets are full again long before this and can be dropped.
+    PRUNE_IDLE_SECONDS = 3600
+
+    def prune(self, now: float) -> None:
+        self.connection.execute(
+            "DELETE FROM login_buckets WHERE updated < ?",
+            (now - self.PRUNE_IDLE_SECONDS,),
+        )
+
+    def _take(self, key: str, rate: float, burst: int) -> float:
+        with self.transaction() as connection:
+            now = self.clock()
+            row = connection.execute(
+                "SELECT tokens, updated FROM login_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row is not None else (burst, now)
+            tokens, wait = _take(tokens, updated, now, rate, burst)
+            connection.execute(
+                "INSERT INTO login_buckets (key, tokens, updated) VALUES (?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE"
+                " SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+        return wait
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return await run_in_threadpool(self._take, key, rate, burst)
+
+
+class LoginThrottle:
+    """
+    Limits login attempts per client IP and per username.
+
+    The IP bucket is checked first, so an address that is already rejected
+    does not drain the buckets of the usernames it tries. Every rejection is
+    one bcrypt verify (and user lookup) that did not run, which is what
+    `hashes_avoided` counts.
+    """
+
+    def __init__(
+        self,
+        backend,
+        ip_per_minute: float = LOGIN_IP_PER_MINUTE,
+        ip_burst: int = LOGIN_IP_BURST,
+        username_per_minute: float = LOGIN_USERNAME_PER_MINUTE,
+        username_burst: int = LOGIN_USERNAME_BURST,
+    ) -> None:
+        self.backend = backend
+        self.ip_rate = ip_per_minute / 60
+        self.ip_burst = ip_burst
+        self.username_rate = username_per_minute / 60
+        self.username_burst = username_burst
+        self.allowed = 0
+        self.rejected_ip = 0
+        self.rejected_username = 0
+
+    async def check(self, username: Optional[str], client_ip: Optional[str]) -> float:
+        """0 when the attempt may go ahead, otherwise seconds until it may."""
+        if self.ip_burst > 0:
+            wait = await self.backend.take(
+                f"ip:{client_ip}", self.ip_rate, self.ip_burst
+            )
+            if wait:
+                self.rejected_ip += 1
+                return wait
+        if self.username_burst > 0:
+            wait = await self.backend.take(
+                f"user:{(username or '').casefold()}",
+                self.username_rate,
+                self.username_burst,
+            )
+            if wait:
+                self.rejected_username += 1
+                return wait
+        self.allowed += 1
+        return 0.0
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "allowed": self.allowed,
+            "rejected_ip": self.rejected_ip,
+            "rejected_username": self.rejected_username,
+            "hashes_avoided": self.rejected_ip + self.rejected_username,
+        }
+
+
+login_throttle = LoginThrottle(
+    make_backend(LOGIN_THROTTLE_BACKEND, MemoryBackend, SQLiteBackend)
+)
@@ -0,0 +1,192 @@
+"""
+Concurrent-request throughput of GET /api/ for each database access mode.
+
+    python -m bench.async_db --requests 500 --concurrency 50 --latency-ms 20
+
+blocking - the pre-async handlers: sync Session calls made on the event loop
+threaded - DB_ASYNC=false: sync Session calls pushed to the threadpool
+async    - DB_ASYNC=true: AsyncSession over aiosqlite
+
+Every statement sleeps for --latency-ms inside the SQLite driver so a local
+file can stand in for a Postgres round trip.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from api import todos as todos_api
+from app.db.database import Base, ThreadedSession, get_async_db
+from app.db.models import Todos
+from bench.load import percentile
+
+DB_FILE = "./bench_async_db.db"
+MODES = ("blocking", "threaded", "async")
+
+
+class BlockingSession(ThreadedSession):
+    """Runs the sync session inline, exactly like the handlers used to."""
+
+    async def execute(self, statement, *args, **kwargs):
+        return self.sync_session.execute(statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return self.sync_session.scalar(statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return self.sync_session.scalars(statement, *args, **kwargs)
+
+    async def close(self) -> None:
+        self.sync_session.close()
+
+
+def seed(todos_per_user: int) -> None:
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    engine = create_engine(f"sqlite:///{DB_FILE}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(
+            Todos(
+                title=f"Todo {i}",
+                description="Benchmark todo",
+                priority=i % 5 + 1,
+                complete=False,
+                owner_id=1,
+            )
+            for i in range(todos_per_user)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def build_app(mode: str, concurrency: int, latency: float):
+    def slow_down(statement):
+        time.sleep(latency)
+
+    app = FastAPI()
+    app.include_router(todos_api.router)
+    app.dependency_overrides[todos_api.get_request_user] = lambda: {
+        "username": "bench",
+        "id": 1,
+        "user_role": "admin",
+    }
+
+    if mode == "async":
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{DB_FILE}",
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=concurrency,
+            max_overflow=0,
+        )
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            dbapi_connection.run_async(
+                lambda connection: connection.set_trace_callback(slow_down)
+            )
+
+        session_factory = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False
+        )
+
+        async def override_get_async_db():
+            async with session_factory() as db:
+                yield db
+
+    else:
+        engine = create_engine(
+            f"sqlite:///{DB_FILE}",
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            pool_size=concurrency,
+            max_overflow=0,
+        )
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            dbapi_connection.set_trace_callback(slow_down)
+
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        session_class = BlockingSession if mode == "blocking" else ThreadedSession
+
+        async def override_get_async_db():
+            db = session_class(session_factory())
+            try:
+                yield db
+            finally:
+                await db.close()
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return app, engine
+
+
+async def run(mode: str, requests: int, concurrency: int, latency: float) -> dict:
+    app, engine = build_app(mode, concurrency, latency)
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def one_request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get("/api/")
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    if mode == "async":
+        await engine.dispose()
+    else:
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests_per_sec": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--todos", type=int, default=20)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    seed(args.todos)
+    try:
+        for mode in args.modes:
+            result = asyncio.run(
+                run(mode, args.requests, args.concurrency, args.latency_ms / 1000)
+            )
+            print(
+                f"{result['mode']:>9}: {result['requests_per_sec']:8.1f} req/s"
+                f"  p50 {result['p50_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms"
+            )
+    finally:
+        os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Latency of GET /api/ while bcrypt logins hammer the same worker.
+
+    python -m bench.hashing --logins 8 --duration 5
+
+idle     - no concurrent logins
+inline   - the old handlers: bcrypt verify runs on the event loop
+executor - bcrypt verify runs on app.hashing.password_hasher's executor
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from api import auth as auth_api, todos as todos_api
+from app.db.database import Base, get_async_db
+from app.db.models import Todos, Users
+from app.hashing import (
+    HASH_EXECUTOR,
+    HASH_WORKERS,
+    PasswordHasher,
+    bcrypt_context,
+)
+from app.throttle import LoginThrottle, MemoryBackend
+from bench.load import percentile
+
+DB_FILE = "./bench_hashing.db"
+MODES = ("idle", "inline", "executor")
+
+
+class InlineHasher(PasswordHasher):
+    """Hashes on the calling thread, exactly like the handlers used to."""
+
+    async def _run(self, fn, *args):
+        return fn(*args)
+
+
+def seed() -> None:
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    engine = create_engine(f"sqlite:///{DB_FILE}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(
+            Users(
+                username="bench",
+                email="bench@email.com",
+                hashed_password=bcrypt_context.hash("bench1234!"),
+                role="admin",
+            )
+        )
+        db.add_all(
+            Todos(title=f"Todo {i}", priority=1, complete=False, owner_id=1)
+            for i in range(20)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def build_app() -> FastAPI:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{DB_FILE}", poolclass=NullPool)
+    session_factory = async_sessionmaker(
+        bind=engine, autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(auth_api.router)
+    app.include_router(todos_api.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[todos_api.get_request_user] = lambda: {
+        "username": "bench",
+        "id": 1,
+        "user_role": "admin",
+    }
+    return app
+
+
+async def run(mode: str, logins: int, duration: float) -> dict:
+    hasher = (
+        InlineHasher()
+        if mode == "inline"
+        else PasswordHasher(HASH_EXECUTOR, HASH_WORKERS)
+    )
+    auth_api.password_hasher = hasher
+    # Every login comes from one client for one user; measure hashing, not
+    # the login throttle.
+    auth_api.login_throttle = LoginThrottle(
+        MemoryBackend(), ip_burst=0, username_burst=0
+    )
+    transport = httpx.ASGITransport(app=build_app())
+    latencies = []
+    login_count = 0
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def login_loop():
+            nonlocal login_count
+            while time.perf_counter() < deadline:
+                response = await client.post(
+                    "/api/auth/token",
+                    data={"username": "bench", "password": "bench1234!"},
+                )
+                assert response.status_code == 200, response.text
+                login_count += 1
+
+        async def list_loop():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/api/")
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+                await asyncio.sleep(0.01)
+
+        login_tasks = [] if mode == "idle" else [login_loop() for _ in range(logins)]
+        await asyncio.gather(list_loop(), *login_tasks)
+
+    hasher.shutdown()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "logins_per_sec": login_count / duration,
+        "list_p50_ms": statistics.median(latencies) * 1000,
+        "list_p99_ms": percentile(latencies, 0.99) * 1000,
+        "list_max_ms": latencies[-1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=8, help="concurrent logins")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    auth_api.secret_key = auth_api.secret_key or "bench-secret"
+    auth_api.alg = auth_api.alg or "HS256"
+
+    seed()
+    try:
+        for mode in args.modes:
+            result = asyncio.run(run(mode, args.logins, args.duration))
+            print(
+                f"{result['mode']:>8}: {result['logins_per_sec']:6.1f} logins/s"
+                f"  GET /api/ p50 {result['list_p50_ms']:7.1f} ms"
+                f"  p99 {result['list_p99_ms']:7.1f} ms"
+                f"  max {result['list_max_ms']:7.1f} ms"
+            )
+    finally:
+        os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+End-to-end mixed workload against main.app, reported per route.
+
+    python -m bench.load --users 20 --todos 50 --requests 2000 --concurrency 20
+
+Seeds --users users with --todos todos each into a local SQLite file (or into
+the empty database given by --database-url / --async-database-url), then
+runs --concurrency virtual users through main.app over httpx's ASGI
+transport. Each virtual user
+logs in via /api/auth/token, keeps the token as a bearer header and as the
+access_token cookie, and issues requests drawn from WORKLOAD until
+--requests have been sent in total.
+
+Prints requests/sec and p50/p95/p99 latency per route template and writes the
+same numbers, with the git commit and arguments, to --output as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import create_engine, insert, text
+
+DB_FILE = "./bench_load.db"
+PASSWORD = "bench1234!"
+
+# (route template, weight). The HTML pages authenticate with the cookie, the
+# /api/ routes with the bearer token.
+WORKLOAD = (
+    ("GET /api/", 30),
+    ("GET /api/todo/{todo_id}", 10),
+    ("POST /api/todo", 8),
+    ("PUT /api/todo/{todo_id}", 8),
+    ("PUT /api/todo/{todo_id}/complete", 10),
+    ("GET /todos", 20),
+    ("GET /todos/edit-todo/{todo_id}", 5),
+    ("GET /todos/complete/{todo_id}", 5),
+    ("POST /api/auth/token", 4),
+)
+BODY_ROUTES = {"POST /api/todo", "PUT /api/todo/{todo_id}"}
+
+
+def seed(url: str, users: int, todos: int) -> None:
+    from app.db.models import Base, Todos, Users
+    from app.hashing import bcrypt_context
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    hashed_password = bcrypt_context.hash(PASSWORD)
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            connection.execute(text("PRAGMA journal_mode=WAL"))
+        connection.execute(
+            insert(Users),
+            [
+                {
+                    "username": f"bench{user}",
+                    "email": f"bench{user}@email.com",
+                    "first_name": "bench",
+                    "last_name": "user",
+                    "hashed_password": hashed_password,
+                    "role": "standard",
+                    "is_active": True,
+                }
+                for user in range(1, users + 1)
+            ],
+        )
+        connection.execute(
+            insert(Todos),
+            [
+                {
+                    "title": f"Todo {i}",
+                    "description": "Load benchmark todo",
+                    "priority": i % 5 + 1,
+                    "complete": False,
+                    "owner_id": user,
+                }
+                for user in range(1, users + 1)
+                for i in range(todos)
+            ],
+        )
+    engine.dispose()
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, user_id: int, todos: int) -> None:
+        self.client = client
+        self.user_id = user_id
+        self.username = f"bench{user_id}"
+        # Seeded ids are assigned user by user, todos per user at a time.
+        self.todo_ids = range((user_id - 1) * todos + 1, user_id * todos + 1)
+        self.headers = {}
+
+    async def login(self) -> httpx.Response:
+        response = await self.client.post(
+            "/api/auth/token", data={"username": self.username, "password": PASSWORD}
+        )
+        if response.status_code == 200:
+            token = response.json()["access_token"]
+            self.headers = {"Authorization": f"Bearer {token}"}
+            self.client.cookies.set("access_token", token)
+        return response
+
+    def todo_body(self) -> dict:
+        return {
+            "title": f"Bench todo {random.randrange(1_000_000)}",
+            "description": "Written by the load benchmark",
+            "priority": random.randint(1, 5),
+            "complete": False,
+        }
+
+    async def request(self, route: str) -> httpx.Response:
+        if route == "POST /api/auth/token":
+            return await self.login()
+        method, template = route.split(" ", 1)
+        path = template.format(todo_id=random.choice(self.todo_ids))
+        if template.startswith("/todos"):
+            return await self.client.get(path)
+        body = self.todo_body() if route in BODY_ROUTES else None
+        return await self.client.request(method, path, json=body, headers=self.headers)
+
+
+async def run(args) -> dict:
+    import main
+
+    routes = [route for route, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    latencies = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    remaining = args.requests
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+
+        async def virtual_user(n: int):
+            nonlocal remaining
+            # One client per virtual user, so each has its own cookie jar.
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as client:
+                user = VirtualUser(client, n % args.users + 1, args.todos)
+                await user.login()
+                while remaining > 0:
+                    remaining -= 1
+                    route = random.choices(routes, weights)[0]
+                    started = time.perf_counter()
+                    response = await user.request(route)
+                    latencies[route].append(time.perf_counter() - started)
+                    # The HTML routes answer with redirects on success.
+                    if response.status_code >= 400:
+                        errors[route] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    from app.db.database import async_engine, engine, replica_async_engine
+
+    for async_engine_ in (async_engine, replica_async_engine):
+        if async_engine_ is not None:
+            await async_engine_.dispose()
+    engine.dispose()
+
+    results = {}
+    for route in routes:
+        values = sorted(latencies[route])
+        if not values:
+            continue
+        results[route] = {
+            "requests": len(values),
+            "errors": errors[route],
+            "requests_per_sec": len(values) / elapsed,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    return {
+        "requests": args.requests,
+        "elapsed_sec": elapsed,
+        "requests_per_sec": args.requests / elapsed,
+        "routes": results,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--todos", type=int, default=50, help="todos per user")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--database-url", default=f"sqlite:///{DB_FILE}")
+    parser.add_argument(
+        "--async-database-url", default=f"sqlite+aiosqlite:///{DB_FILE}"
+    )
+    parser.add_argument("--output", default="bench_load.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # app.db.database builds its engines at import time, so the URLs must be
+    # in place before main is imported.
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["ASYNC_DATABASE_URL"] = args.async_database_url
+    os.environ.setdefault("DB_POOL_SIZE", str(args.concurrency))
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    # Virtual users share one client address and log in repeatedly; the
+    # login throttle would turn most of those into 429s.
+    os.environ.setdefault("LOGIN_IP_BURST", "0")
+    os.environ.setdefault("LOGIN_USERNAME_BURST", "0")
+
+    random.seed(args.seed)
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    seed(args.database_url, args.users, args.todos)
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if args.database_url == f"sqlite:///{DB_FILE}":
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(DB_FILE + suffix):
+                    os.remove(DB_FILE + suffix)
+
+    print(
+        f"{'total':>34}: {result['requests_per_sec']:8.1f} req/s"
+        f"  ({result['requests']} requests in {result['elapsed_sec']:.1f} s)"
+    )
+    for route, stats in result["routes"].items():
+        print(
+            f"{route:>34}: {stats['requests_per_sec']:8.1f} req/s"
+            f"  p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms"
+            f"  p99 {stats['p99_ms']:7.1f} ms  errors {stats['errors']}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "args": vars(args),
+                **result,
+            },
+            f,
+            indent=2,
+        )
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
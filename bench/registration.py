@@ -0,0 +1,184 @@
+"""
+Registration throughput for unique and duplicate-heavy sign-up traffic.
+
+    python -m bench.registration --requests 200 --concurrency 20
+
+legacy  - the old create_user: bcrypt hash, then two uniqueness SELECTs
+current - api.auth.create_user: one uniqueness SELECT, hash only on success
+
+The duplicate workload re-registers existing usernames/emails for
+--duplicate-ratio of its requests.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from starlette import status
+
+from api import auth as auth_api
+from api.auth import CreateUserRequest, db_dependency
+from app.db.database import Base, get_async_db
+from app.db.models import Users
+from app.hashing import HASH_EXECUTOR, HASH_WORKERS, PasswordHasher, bcrypt_context
+
+DB_FILE = "./bench_registration.db"
+MODES = ("legacy", "current")
+WORKLOADS = ("unique", "duplicate")
+EXISTING_USERS = 50
+
+
+async def legacy_create_user(db: db_dependency, create_user_request: CreateUserRequest):
+    create_user_model = Users(
+        email=create_user_request.email,
+        username=create_user_request.username,
+        first_name=create_user_request.first_name,
+        last_name=create_user_request.last_name,
+        role=create_user_request.role,
+        hashed_password=await auth_api.password_hasher.hash(
+            create_user_request.password
+        ),
+        is_active=True,
+        phone_number=create_user_request.phone_number,
+    )
+    if await db.scalar(
+        select(Users).where(Users.username == create_user_model.username)
+    ):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT)
+    if await db.scalar(select(Users).where(Users.email == create_user_model.email)):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT)
+    db.add(create_user_model)
+    await db.commit()
+
+
+def seed() -> None:
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    engine = create_engine(f"sqlite:///{DB_FILE}")
+    Base.metadata.create_all(bind=engine)
+    hashed_password = bcrypt_context.hash("bench1234!")
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(
+            Users(
+                username=f"existing{i}",
+                email=f"existing{i}@email.com",
+                hashed_password=hashed_password,
+                role="standard",
+            )
+            for i in range(EXISTING_USERS)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def registration(mode: str, workload: str, n: int, duplicate_ratio: float) -> dict:
+    if workload == "duplicate" and random.random() < duplicate_ratio:
+        i = random.randrange(EXISTING_USERS)
+        username, email = f"existing{i}", f"existing{i}@email.com"
+    else:
+        username, email = f"{mode}-{workload}-{n}", f"{mode}-{workload}-{n}@email.com"
+    return {
+        "username": username,
+        "email": email,
+        "first_name": "bench",
+        "last_name": "user",
+        "password": "bench1234!",
+        "role": "standard",
+        "phone_number": "(111)-111-1111",
+    }
+
+
+async def run(mode: str, workload: str, args) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{DB_FILE}", poolclass=NullPool)
+    session_factory = async_sessionmaker(
+        bind=engine, autoflush=False, expire_on_commit=False
+    )
+    queries = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_query(*args):
+        nonlocal queries
+        queries += 1
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    if mode == "legacy":
+        app.post("/api/auth/", status_code=status.HTTP_201_CREATED)(legacy_create_user)
+    else:
+        app.include_router(auth_api.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    hasher = PasswordHasher(HASH_EXECUTOR, HASH_WORKERS)
+    auth_api.password_hasher = hasher
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcomes = {status.HTTP_201_CREATED: 0, status.HTTP_409_CONFLICT: 0}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def register(n: int):
+            async with semaphore:
+                response = await client.post(
+                    "/api/auth/",
+                    json=registration(mode, workload, n, args.duplicate_ratio),
+                )
+                outcomes[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(register(n) for n in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    hasher.shutdown()
+    await engine.dispose()
+    return {
+        "mode": mode,
+        "workload": workload,
+        "requests_per_sec": args.requests / elapsed,
+        "created": outcomes[status.HTTP_201_CREATED],
+        "conflicts": outcomes[status.HTTP_409_CONFLICT],
+        "hashes": hasher.completed,
+        "queries": queries,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    seed()
+    try:
+        for workload in WORKLOADS:
+            for mode in MODES:
+                random.seed(args.seed)
+                result = asyncio.run(run(mode, workload, args))
+                print(
+                    f"{result['workload']:>9} {result['mode']:>7}:"
+                    f" {result['requests_per_sec']:7.1f} req/s"
+                    f"  created {result['created']:4d}"
+                    f"  conflicts {result['conflicts']:4d}"
+                    f"  bcrypt hashes {result['hashes']:4d}"
+                    f"  queries {result['queries']:5d}"
+                )
+    finally:
+        os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
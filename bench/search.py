@@ -0,0 +1,154 @@
+"""
+Latency of GET /api/todos/search's query on a large todo table.
+
+    python -m bench.search --rows 1000000 --users 10 --queries 200
+
+Seeds --rows todos with random English titles and descriptions spread over
+--users owners into a local SQLite file (or into the empty database given by
+--database-url), then runs --queries random one- and two-word searches for
+random owners and reports p50/p95/p99 latency of the first page, separately
+for common words (a few percent of all todos each) and rare ones (a ticket
+number mentioned by a handful of todos):
+
+fts  - search_statement: FTS5 on SQLite, the GIN-indexed tsvector on Postgres
+like - the client-side equivalent done in SQL, a substring match per word
+"""
+
+import argparse
+import os
+import random
+import time
+
+from sqlalchemy import and_, create_engine, insert, or_, select, text
+
+from app.db.database import Base
+from app.db.models import Todos, Users
+from app.db.search import search_statement
+
+DB_FILE = "./bench_search.db"
+SEED_BATCH = 50_000
+TICKETS = 100_000
+
+WORDS = (
+    "buy milk bread eggs coffee call mom dad doctor dentist plumber book flight "
+    "hotel train tickets pay rent taxes invoice bills renew passport license "
+    "insurance clean kitchen garage bathroom windows car wash laundry iron "
+    "shirts water plants garden mow lawn walk dog feed cat vet appointment "
+    "review pull request code deploy release fix bug write tests update docs "
+    "prepare slides meeting agenda notes email reply client report budget "
+    "quarterly plan sprint backlog refactor database migration index query "
+    "learn python rust spanish guitar piano read novel chapter exercise gym "
+    "run yoga swim cook dinner lunch recipe grocery list birthday gift party "
+    "anniversary cake flowers schedule backup photos laptop phone repair"
+).split()
+
+
+def sentence(words: int) -> str:
+    return " ".join(random.choices(WORDS, k=words)).capitalize()
+
+
+def seed(url: str, rows: int, users: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Users),
+            [
+                {"id": user, "username": f"search{user}", "email": f"{user}@x"}
+                for user in range(1, users + 1)
+            ],
+        )
+    for start in range(0, rows, SEED_BATCH):
+        with engine.begin() as conn:
+            conn.execute(
+                insert(Todos),
+                [
+                    {
+                        "title": sentence(random.randint(2, 5)),
+                        "description": sentence(random.randint(5, 12))
+                        + f" ticket{random.randrange(TICKETS)}",
+                        "priority": random.randint(1, 5),
+                        "complete": random.random() < 0.3,
+                        "owner_id": random.randint(1, users),
+                    }
+                    for _ in range(start, min(rows, start + SEED_BATCH))
+                ],
+            )
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE todos"))
+    return engine
+
+
+def like_statement(dialect: str, owner_id: int, q: str):
+    terms = [
+        or_(Todos.title.ilike(f"%{term}%"), Todos.description.ilike(f"%{term}%"))
+        for term in q.split()
+    ]
+    return (
+        select(Todos.__table__)
+        .where(Todos.owner_id == owner_id, and_(*terms))
+        .order_by(Todos.id)
+    )
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--database-url", default=f"sqlite:///{DB_FILE}")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    started = time.perf_counter()
+    engine = seed(args.database_url, args.rows, args.users)
+    print(f"seeded {args.rows} todos in {time.perf_counter() - started:.1f} s")
+
+    searches = {
+        "common": [
+            (random.randint(1, args.users), " ".join(random.sample(WORDS, k)))
+            for k in random.choices((1, 2), k=args.queries)
+        ],
+        "rare": [
+            (random.randint(1, args.users), f"ticket{random.randrange(TICKETS)}")
+            for _ in range(args.queries)
+        ],
+    }
+    try:
+        for name, build in (("fts", search_statement), ("like", like_statement)):
+            for kind, queries in searches.items():
+                timings = []
+                matches = 0
+                with engine.connect() as conn:
+                    for owner_id, q in queries:
+                        statement = build(engine.dialect.name, owner_id, q)
+                        started = time.perf_counter()
+                        rows = conn.execute(statement.limit(args.limit)).all()
+                        timings.append(time.perf_counter() - started)
+                        matches += len(rows)
+                timings.sort()
+                print(
+                    f"{name:>4} {kind:>6}:"
+                    f" p50 {percentile(timings, 0.50) * 1000:8.2f} ms"
+                    f"  p95 {percentile(timings, 0.95) * 1000:8.2f} ms"
+                    f"  p99 {percentile(timings, 0.99) * 1000:8.2f} ms"
+                    f"  ({matches / len(queries):.1f} rows per page)"
+                )
+    finally:
+        engine.dispose()
+        if args.database_url == f"sqlite:///{DB_FILE}":
+            os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
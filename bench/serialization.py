@@ -0,0 +1,91 @@
+"""
+Cost of turning a 10k-row todo list into a JSON response body.
+
+    python -m bench.serialization --rows 10000 --repeat 5
+
+orm-jsonable - the old path: ORM instances, jsonable_encoder, JSONResponse
+rows-model   - the current path: row mappings validated by the response
+               model and rendered by ORJSONResponse
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from api.todos import TodoResponse
+from app.db.database import Base
+from app.db.models import Todos
+
+DB_FILE = "./bench_serialization.db"
+
+
+def seed(rows: int):
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    engine = create_engine(f"sqlite:///{DB_FILE}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Todos),
+            [
+                {
+                    "title": f"Todo {i}",
+                    "description": "Serialization benchmark",
+                    "priority": i % 5 + 1,
+                    "complete": i % 2 == 0,
+                    "owner_id": 1,
+                }
+                for i in range(rows)
+            ],
+        )
+    return engine
+
+
+def orm_jsonable(db) -> bytes:
+    todos = db.scalars(select(Todos)).all()
+    return JSONResponse(jsonable_encoder(todos)).body
+
+
+def rows_model(db, adapter=TypeAdapter(list[TodoResponse])) -> bytes:
+    todos = db.execute(select(Todos.__table__)).mappings().all()
+    content = adapter.dump_python(adapter.validate_python(todos), mode="json")
+    return ORJSONResponse(content).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = seed(args.rows)
+    session_factory = sessionmaker(bind=engine)
+    try:
+        for name, serialize in (
+            ("orm-jsonable", orm_jsonable),
+            ("rows-model", rows_model),
+        ):
+            timings = []
+            for _ in range(args.repeat):
+                with session_factory() as db:
+                    started = time.perf_counter()
+                    body = serialize(db)
+                    timings.append(time.perf_counter() - started)
+            print(
+                f"{name:>12}: median {statistics.median(timings) * 1000:8.1f} ms"
+                f"  best {min(timings) * 1000:8.1f} ms  ({len(body)} bytes)"
+            )
+    finally:
+        engine.dispose()
+        os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
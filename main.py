@@ -1,7 +1,15 @@
+import time
+
+# Taken before the imports below so the startup report includes them.
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from starlette import status
-from starlette.responses import RedirectResponse
-from starlette.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import PlainTextResponse, RedirectResponse
 
 from api import (
     auth as auth_api,
@@ -9,14 +17,43 @@ from api import (
     admin as admin_api,
     users as users_api,
 )
-from app.db import models
-from app.db.database import engine
+from app.assets import AssetFiles, manifest, static_directory
+from app.db.database import async_engine, engine, replica_async_engine
+from app.metrics import MetricsMiddleware, instrument_engine, registry
+from app.startup import StartupTimer, ensure_schema, log_report, warm_pool
+from app.templating import precompile_templates
 from routers import todos as todos_router, auth as auth_router, users as user_router
 
-app = FastAPI()
-models.Base.metadata.create_all(bind=engine)
+startup_timer = StartupTimer(_import_started)
+startup_timer.phases["import"] = (time.perf_counter() - _import_started) * 1000
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_timer.phase("schema"):
+        await run_in_threadpool(ensure_schema)
+    with startup_timer.phase("pool"):
+        await warm_pool()
+    with startup_timer.phase("templates"):
+        precompile_templates()
+    app.state.startup = startup_timer.report()
+    log_report(app.state.startup)
+    yield
+
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+instrument_engine(engine)
+for _async_engine in (async_engine, replica_async_engine):
+    if _async_engine is not None:
+        instrument_engine(_async_engine.sync_engine)
+
+app.mount(
+    "/static",
+    AssetFiles(directory=static_directory, manifest=manifest),
+    name="static",
+)
 
 
 @app.get("/healthy")
@@ -24,6 +61,11 @@ def health_check():
     return {"status": "Healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     return RedirectResponse(url="/todos", status_code=status.HTTP_302_FOUND)
@@ -2,19 +2,17 @@ from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, Form
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.responses import RedirectResponse
 
 from api.auth import login_for_access_token, create_user, CreateUserRequest
-from app.db.database import get_db
+from app.db.database import get_async_db
+from app.templating import templates
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory="templates")
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
 
 
 class LoginForm:
@@ -41,15 +39,22 @@ async def login(request: Request, db: db_dependency):
         await login_form.create_oauth_form()
 
         response = RedirectResponse(url="/todos", status_code=status.HTTP_302_FOUND)
-        token = (await login_for_access_token(form_data=login_form, db=db))[
-            "access_token"
-        ]
+        token = (
+            await login_for_access_token(request=request, form_data=login_form, db=db)
+        )["access_token"]
 
         await set_cookie(response=response, token=token)
 
         return response
 
-    except HTTPException:
+    except HTTPException as e:
+        if e.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+            return templates.TemplateResponse(
+                "login.html",
+                {"request": request, "msg": "Too many attempts, try again later"},
+                status_code=e.status_code,
+                headers=e.headers,
+            )
         return templates.TemplateResponse(
             "login.html", {"request": request, "msg": "Unknown Error"}
         )
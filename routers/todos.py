@@ -1,14 +1,16 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Request, Depends, Form
+from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.responses import RedirectResponse
 
+from api.auth import get_request_user
 from api.todos import (
     TodoRequest,
+    get_todos_version,
+    page_cache,
     read_all,
     read_todo,
     create_todo,
@@ -16,41 +18,50 @@ from api.todos import (
     delete_todo,
     complete_todo,
 )
-from app.db.database import get_db
-from routers.auth_utils import get_user_model_based_on_token
+from app.db.database import get_async_db
+from app.templating import templates
 
 router = APIRouter(tags=["todos"], responses={404: {"description": "Not Found"}})
 
-templates = Jinja2Templates(directory="templates")
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+user_dependency = Annotated[Optional[dict], Depends(get_request_user)]
 
 
 @router.get("/todos", response_class=HTMLResponse)
-async def read_all_by_user(request: Request, db: db_dependency):
-    token = request.cookies.get("access_token")
-
-    if token is None:
+async def read_all_by_user(
+    request: Request,
+    user: user_dependency,
+    db: db_dependency,
+    cursor: Optional[str] = None,
+):
+    if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
-    user = await get_user_model_based_on_token(token)
-
-    todo_model = await read_all(user, db)
-
-    return templates.TemplateResponse(
-        "home.html", {"request": request, "todos": todo_model, "user": user}
-    )
+    # Versioned by the database, so writes made through any worker show up.
+    version = await get_todos_version(db, user.get("id"))
+    key = page_cache.key(user.get("id"), version, cursor)
+    html = page_cache.get(key)
+    if html is None:
+        page = await read_all(user, db, cursor=cursor)
+        html = page_cache.render(
+            templates.get_template("home.html"),
+            {
+                "request": request,
+                "todos": page["todos"],
+                "next_cursor": page["next_cursor"],
+                "user": user,
+            },
+        )
+        page_cache.set(key, html)
+
+    return HTMLResponse(html)
 
 
 @router.get("/todos/add-todo", response_class=HTMLResponse)
-async def add_new_todo(request: Request):
-    token = request.cookies.get("access_token")
-
-    if token is None:
+async def add_new_todo(request: Request, user: user_dependency):
+    if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
-    user = await get_user_model_based_on_token(token)
-
     return templates.TemplateResponse(
         "add-todo.html", {"request": request, "user": user}
     )
@@ -59,18 +70,15 @@ async def add_new_todo(request: Request):
 @router.post("/todos/add-todo", response_class=HTMLResponse)
 async def create_todo_by_user(
     request: Request,
+    user: user_dependency,
     db: db_dependency,
     title: str = Form(...),
     description: str = Form(...),
     priority: int = Form(...),
 ):
-    token = request.cookies.get("access_token")
-
-    if token is None:
+    if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
-    user = await get_user_model_based_on_token(token)
-
     todo_request = TodoRequest(
         title=title, description=description, priority=priority, complete=False
     )
@@ -79,14 +87,12 @@ async def create_todo_by_user(
 
 
 @router.get("/todos/edit-todo/{todo_id}", response_class=HTMLResponse)
-async def edit_todo_as_user(request: Request, todo_id: int, db: db_dependency):
-    token = request.cookies.get("access_token")
-
-    if token is None:
+async def edit_todo_as_user(
+    request: Request, user: user_dependency, todo_id: int, db: db_dependency
+):
+    if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
-    user = await get_user_model_based_on_token(token)
-
     todo_model = await read_todo(user, db, todo_id)
 
     return templates.TemplateResponse(
@@ -97,19 +103,16 @@ async def edit_todo_as_user(request: Request, todo_id: int, db: db_dependency):
 @router.post("/todos/edit-todo/{todo_id}", response_class=HTMLResponse)
 async def edit_todo_as_user_and_commit(
     request: Request,
+    user: user_dependency,
     db: db_dependency,
     todo_id: int,
     title: str = Form(...),
     description: str = Form(...),
     priority: int = Form(...),
 ):
-    token = request.cookies.get("access_token")
-
-    if token is None:
+    if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
-    user = await get_user_model_based_on_token(token)
-
     todo_request = TodoRequest(
         title=title, description=description, priority=priority, complete=False
     )
@@ -118,28 +121,27 @@ async def edit_todo_as_user_and_commit(
 
 
 @router.get("/todos/delete/{todo_id}", response_class=HTMLResponse)
-async def delete_todo(request: Request, todo_id: int, db: db_dependency):
-    user = await get_user_model_based_on_request(request)
-
-    todo_model = await read_todo(user, db, todo_id)
-
-    if todo_model is None:
-        return RedirectResponse(url="/todos", status_code=status.HTTP_302_FOUND)
+async def delete_todo_as_user(
+    request: Request, user: user_dependency, todo_id: int, db: db_dependency
+):
+    if user is None:
+        return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
-    await delete_todo(user, db, todo_id)
+    try:
+        await delete_todo(user, db, todo_id)
+    except HTTPException:
+        pass
 
     return RedirectResponse(url="/todos", status_code=status.HTTP_302_FOUND)
 
 
 @router.get("/todos/complete/{todo_id}", response_class=HTMLResponse)
-async def complete_todo_as_user(request: Request, todo_id: int, db: db_dependency):
-    token = request.cookies.get("access_token")
-
-    if token is None:
+async def complete_todo_as_user(
+    request: Request, user: user_dependency, todo_id: int, db: db_dependency
+):
+    if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
-    user = await get_user_model_based_on_token(token)
-
     await complete_todo(user, db, todo_id)
 
     return RedirectResponse(url="/todos", status_code=status.HTTP_302_FOUND)
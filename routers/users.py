@@ -1,34 +1,29 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, Request, Form
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.responses import RedirectResponse
 
+from api.auth import get_request_user
 from api.users import change_password, UserVerification
-from app.db.database import get_db
-from routers.auth_utils import get_user_model_based_on_token
+from app.db.database import get_async_db
+from app.templating import templates
 
 router = APIRouter(
     prefix="/users", tags=["users"], responses={404: {"description": "Not Found"}}
 )
 
-templates = Jinja2Templates(directory="templates")
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+user_dependency = Annotated[Optional[dict], Depends(get_request_user)]
 
 
 @router.get("/change-password", response_class=HTMLResponse)
-async def edit_user_view(request: Request):
-    token = request.cookies.get("access_token")
-
-    if token is None:
+async def edit_user_view(request: Request, user: user_dependency):
+    if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
-    user = await get_user_model_based_on_token(token)
-
     return templates.TemplateResponse(
         "change-user-password.html",
         {
@@ -41,16 +36,13 @@ async def edit_user_view(request: Request):
 @router.post("/change-password", response_class=HTMLResponse)
 async def user_password_change(
     request: Request,
+    user: user_dependency,
     db: db_dependency,
     password: str = Form(...),
     password2: str = Form(...),
 ):
-    token = request.cookies.get("access_token")
-
-    if token is None:
+    if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
-
-    user = await get_user_model_based_on_token(token)
     user_verification = UserVerification(password=password, new_password=password2)
     await change_password(user, db, user_verification)
 
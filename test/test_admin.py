@@ -1,30 +1,126 @@
+import json
+
 from fastapi import status
 
-from api.admin import get_db, get_current_user
+from api.admin import get_async_db, get_request_user, get_session_factory
 from app.db.models import Todos
 from .utils import *
 
-app.dependency_overrides[get_db] = override_get_db
-app.dependency_overrides[get_current_user] = override_get_current_user
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_session_factory] = override_get_session_factory
+app.dependency_overrides[get_request_user] = override_get_current_user
 
 
 def test_admin_read_all_authenticated(test_todo):
-    response = client.get("/api/admin/todo")
+    with assert_statements("SELECT todos"):
+        response = client.get("/api/admin/todo")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "todos": [
+            {
+                "complete": False,
+                "description": "Need to learn everyday",
+                "id": 1,
+                "owner_id": 1,
+                "title": "Learn to code",
+                "priority": 5,
+            }
+        ],
+        "next_cursor": None,
+    }
+
+
+def test_admin_read_all_paginated(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        [
+            Todos(title="Other", description="Second owner", priority=1, owner_id=2),
+            Todos(title="Second", description="First owner", priority=1, owner_id=1),
+        ]
+    )
+    db.commit()
+
+    with assert_statements("SELECT todos"):
+        response = client.get("/api/admin/todo", params={"limit": 2})
+    page = response.json()
+    assert [(t["owner_id"], t["id"]) for t in page["todos"]] == [(1, 1), (2, 2)]
+
+    response = client.get(
+        "/api/admin/todo", params={"limit": 2, "cursor": page["next_cursor"]}
+    )
+    page = response.json()
+    assert [(t["owner_id"], t["id"]) for t in page["todos"]] == [(1, 3)]
+    assert page["next_cursor"] is None
+
+
+def test_admin_read_all_pages_through_ownerless_todos(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        [
+            Todos(title="Orphan", description="No owner", priority=1, owner_id=None),
+            Todos(title="Second", description="First owner", priority=1, owner_id=1),
+        ]
+    )
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 1} if cursor is None else {"limit": 1, "cursor": cursor}
+        response = client.get("/api/admin/todo", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        seen += [(t["owner_id"], t["id"]) for t in page["todos"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [(1, 1), (None, 2), (1, 3)]
+
+
+def test_admin_export_ndjson(test_todo):
+    with assert_statements("SELECT todos"):
+        response = client.get("/api/admin/todo/export")
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == [
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
         {
-            "complete": False,
-            "description": "Need to learn everyday",
             "id": 1,
             "owner_id": 1,
             "title": "Learn to code",
+            "description": "Need to learn everyday",
             "priority": 5,
+            "complete": False,
         }
     ]
 
 
+def test_admin_export_csv_filtered(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        [
+            Todos(title="Done", description="Finished", priority=2, owner_id=1),
+            Todos(title="Other", description="Second owner", priority=1, owner_id=2),
+        ]
+    )
+    db.commit()
+    db.query(Todos).filter(Todos.id == 2).update({"complete": True})
+    db.commit()
+
+    with assert_statements("SELECT todos"):
+        response = client.get(
+            "/api/admin/todo/export",
+            params={"format": "csv", "owner_id": 1, "complete": True},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "id,owner_id,title,description,priority,complete",
+        "2,1,Done,Finished,2,True",
+    ]
+
+
 def test_admin_delete_todo(test_todo):
-    response = client.delete("/api/admin/todo/1")
+    with assert_statements("DELETE todos"):
+        response = client.delete("/api/admin/todo/1")
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
     db = TestingSessionLocal()
@@ -32,7 +128,45 @@ def test_admin_delete_todo(test_todo):
     assert model is None
 
 
+def test_admin_delete_todo_without_owner(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title="Orphan", description="No owner", priority=1))
+    db.commit()
+
+    response = client.delete("/api/admin/todo/2")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert db.query(Todos).filter(Todos.id == 2).first() is None
+
+
 def test_admin_delete_todo_not_found(test_todo):
-    response = client.delete("/api/admin/todo/9999")
+    with assert_statements("DELETE todos"):
+        response = client.delete("/api/admin/todo/9999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json() == {"detail": "Todo not found"}
+
+
+def test_admin_hashing_stats():
+    with assert_statements():
+        response = client.get("/api/admin/stats/hashing")
+    assert response.status_code == status.HTTP_200_OK
+    assert {"workers", "in_flight", "queued", "peak_queued"} <= response.json().keys()
+
+
+def test_admin_page_cache_stats():
+    with assert_statements():
+        response = client.get("/api/admin/stats/page-cache")
+    assert response.status_code == status.HTTP_200_OK
+    assert {"hit_rate", "renders", "avg_render_ms"} <= response.json().keys()
+
+
+def test_admin_startup_stats():
+    with assert_statements():
+        response = client.get("/api/admin/stats/startup")
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_admin_pool_stats():
+    with assert_statements():
+        response = client.get("/api/admin/stats/pool")
+    assert response.status_code == status.HTTP_200_OK
+    assert {"checked_out", "overflow", "avg_wait_ms"} <= response.json()["sync"].keys()
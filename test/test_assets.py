@@ -0,0 +1,59 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.assets import AssetFiles, accepted_encodings, build
+
+CSS = b"body { color: red; }\n" * 50
+
+
+def build_client(tmp_path):
+    source = tmp_path / "static"
+    (source / "css").mkdir(parents=True)
+    (source / "css" / "site.css").write_bytes(CSS)
+    manifest = build(str(source), str(tmp_path / "build"))
+
+    app = FastAPI()
+    app.mount(
+        "/static",
+        AssetFiles(directory=str(tmp_path / "build"), manifest=manifest),
+        name="static",
+    )
+    return TestClient(app), manifest
+
+
+def test_build_writes_hashed_and_compressed_files(tmp_path):
+    _, manifest = build_client(tmp_path)
+    hashed = manifest["css/site.css"]
+    assert hashed.startswith("css/site.") and hashed.endswith(".css")
+    assert (tmp_path / "build" / hashed).read_bytes() == CSS
+    assert gzip.decompress((tmp_path / "build" / f"{hashed}.gz").read_bytes()) == CSS
+
+
+def test_hashed_asset_is_immutable_and_negotiated(tmp_path):
+    client, manifest = build_client(tmp_path)
+    url = "/static/" + manifest["css/site.css"]
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == CSS
+
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == CSS
+
+
+def test_unhashed_asset_is_revalidated(tmp_path):
+    client, _ = build_client(tmp_path)
+    response = client.get("/static/css/site.css")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_accepted_encodings_skips_refused():
+    assert accepted_encodings("gzip;q=0, br;q=0.5, identity") == {"br", "identity"}
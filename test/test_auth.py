@@ -1,38 +1,47 @@
 from .utils import *
 from api.auth import (
-    get_db,
+    get_async_db,
     authenticate_user,
     create_access_token,
     secret_key,
     alg,
     get_current_user,
+    get_request_user,
+    token_cache,
 )
+from app.metrics import registry
+from app.hashing import password_hasher
 from jose import jwt
 from datetime import timedelta
 import pytest
 from fastapi import HTTPException, status
+from starlette.requests import Request
 
-app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 
-def test_authenticate_user(test_user):
-    db = TestingSessionLocal()
-
-    authenticated_user = authenticate_user(test_user.username, "test1234!", db)
+@pytest.mark.asyncio
+async def test_authenticate_user(test_user):
+    async with TestingAsyncSessionLocal() as db:
+        authenticated_user = await authenticate_user(
+            test_user.username, "test1234!", db
+        )
     assert authenticated_user is not None
     assert authenticated_user.username == test_user.username
 
 
-def test_authenticate_user_non_existent(test_user):
-    db = TestingSessionLocal()
-    with pytest.raises(ValueError):
-        authenticate_user("WrongUserNAme", "password", db)
+@pytest.mark.asyncio
+async def test_authenticate_user_non_existent(test_user):
+    async with TestingAsyncSessionLocal() as db:
+        with pytest.raises(ValueError):
+            await authenticate_user("WrongUserNAme", "password", db)
 
 
-def test_authenticate_user_wrong_password(test_user):
-    db = TestingSessionLocal()
-    with pytest.raises(ValueError):
-        authenticate_user(test_user.username, "wrong_pass", db)
+@pytest.mark.asyncio
+async def test_authenticate_user_wrong_password(test_user):
+    async with TestingAsyncSessionLocal() as db:
+        with pytest.raises(ValueError):
+            await authenticate_user(test_user.username, "wrong_pass", db)
 
 
 def test_create_access_token():
@@ -68,3 +77,140 @@ async def test_get_current_user_missing_payload():
 
     assert e.value.status_code == status.HTTP_401_UNAUTHORIZED
     assert e.value.detail == "Could not validate user"
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_decoded_token():
+    token_cache.clear()
+    token = create_access_token("testuser", 1, "admin", timedelta(minutes=20))
+    hits = token_cache.hits
+
+    first = await get_current_user(token)
+    second = await get_current_user(token)
+
+    assert first == second == {"username": "testuser", "id": 1, "user_role": "admin"}
+    assert token_cache.hits == hits + 1
+    assert len(token_cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_does_not_cache_expired_token():
+    token_cache.clear()
+    token = create_access_token("testuser", 1, "admin", timedelta(minutes=-1))
+
+    with pytest.raises(HTTPException) as e:
+        await get_current_user(token)
+
+    assert e.value.status_code == status.HTTP_401_UNAUTHORIZED
+    assert len(token_cache) == 0
+
+
+@pytest.fixture
+def real_request_user():
+    """Resolve the user from real credentials instead of the test override."""
+    override = app.dependency_overrides.pop(get_request_user, None)
+    yield
+    if override is not None:
+        app.dependency_overrides[get_request_user] = override
+
+
+def test_request_user_from_bearer_or_cookie(test_user, real_request_user):
+    token = create_access_token("admin", test_user.id, "admin", timedelta(minutes=5))
+
+    response = client.get("/api/user/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["username"] == "admin"
+
+    response = client.get("/api/user/", cookies={"access_token": token})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["username"] == "admin"
+
+    response = client.get("/api/user/")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json() == {"detail": "Authentication Failed"}
+
+
+def test_request_user_invalid_cookie_redirects(test_user, real_request_user):
+    response = client.get(
+        "/todos", cookies={"access_token": "not-a-token"}, follow_redirects=False
+    )
+    assert response.status_code == status.HTTP_302_FOUND
+    assert response.headers["location"] == "/auth"
+
+
+@pytest.mark.asyncio
+async def test_request_user_resolved_once(monkeypatch):
+    token = create_access_token("testuser", 1, "admin", timedelta(minutes=5))
+    calls = []
+
+    async def counting_get_current_user(token):
+        calls.append(token)
+        return await get_current_user(token)
+
+    monkeypatch.setattr("api.auth.get_current_user", counting_get_current_user)
+    request = Request(
+        {"type": "http", "headers": [(b"cookie", f"access_token={token}".encode())]}
+    )
+    observed = sum(h.count for h in registry.auth_latency.values())
+
+    first = await get_request_user(request, None)
+    second = await get_request_user(request, None)
+
+    assert first == second == {"username": "testuser", "id": 1, "user_role": "admin"}
+    assert request.state.user is first
+    assert request.state.auth_seconds >= 0
+    assert calls == [token]
+    assert registry.auth_latency["cookie"].count >= 1
+    assert sum(h.count for h in registry.auth_latency.values()) == observed + 1
+
+
+def new_user_request(**overrides):
+    return {
+        "username": "newuser",
+        "email": "newuser@email.com",
+        "first_name": "new",
+        "last_name": "user",
+        "password": "test1234!",
+        "role": "standard",
+        "phone_number": "(222)-222-2222",
+        **overrides,
+    }
+
+
+def test_create_user(test_user):
+    with assert_statements("SELECT users", "INSERT users"):
+        response = client.post("/api/auth/", json=new_user_request())
+    assert response.status_code == status.HTTP_201_CREATED
+
+    db = TestingSessionLocal()
+    model = db.query(Users).filter(Users.username == "newuser").first()
+    assert bcrypt_context.verify("test1234!", model.hashed_password)
+    db.delete(model)
+    db.commit()
+
+
+@pytest.mark.parametrize(
+    "overrides, detail",
+    [
+        ({"username": "admin"}, "Username already exists"),
+        ({"email": "admin@email.com"}, "Email already exists"),
+        ({"username": "admin", "email": "admin@email.com"}, "Username already exists"),
+    ],
+)
+def test_create_user_conflict_skips_hashing(test_user, overrides, detail):
+    hashed = password_hasher.completed
+    with assert_statements("SELECT users"):
+        response = client.post("/api/auth/", json=new_user_request(**overrides))
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json() == {"detail": detail}
+    assert password_hasher.completed == hashed
+
+
+def test_login_for_access_token(test_user):
+    with assert_statements("SELECT users"):
+        response = client.post(
+            "/api/auth/token", data={"username": "admin", "password": "test1234!"}
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["token_type"] == "bearer"
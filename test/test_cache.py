@@ -0,0 +1,71 @@
+from app.cache import FragmentCache, LRUCache
+from .utils import FakeClock
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries():
+    clock = FakeClock()
+    cache = LRUCache(10, clock=clock)
+    cache.set("token", {"id": 1}, expires_at=clock.now + 60)
+    assert cache.get("token") == {"id": 1}
+
+    clock.now += 60
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_counts_hits_and_misses():
+    cache = LRUCache(10)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 2 / 3
+
+
+def test_lru_cache_disabled():
+    cache = LRUCache(0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+class FakeTemplate:
+    def render(self, context):
+        return f"<p>{context['title']}</p>"
+
+
+def test_fragment_cache_keyed_by_version():
+    cache = FragmentCache(10)
+    cache.set(cache.key(1, 7, None), cache.render(FakeTemplate(), {"title": "Mine"}))
+    cache.set(cache.key(2, 3, None), "<p>Theirs</p>")
+    assert cache.get(cache.key(1, 7, None)) == "<p>Mine</p>"
+
+    # A write anywhere bumps the owner's version; the old entry is unreachable.
+    assert cache.get(cache.key(1, 8, None)) is None
+    assert cache.get(cache.key(2, 3, None)) == "<p>Theirs</p>"
+    assert cache.stats()["renders"] == 1
+
+
+def test_fragment_cache_expires_entries():
+    clock = FakeClock()
+    cache = FragmentCache(10, ttl=30, clock=clock)
+    cache.set(cache.key(1, 0, None), "<p>Mine</p>")
+    clock.now += 30
+    assert cache.get(cache.key(1, 0, None)) is None
@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import select
+
+from app.db import database
+from app.db.database import ThreadedSession, get_async_db
+from app.db.models import Todos
+from .utils import *
+
+
+@pytest.mark.asyncio
+async def test_get_async_db_sync_fallback(test_todo, monkeypatch):
+    monkeypatch.setattr(database, "DB_ASYNC", False)
+    monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
+
+    db_generator = get_async_db()
+    db = await db_generator.__anext__()
+    assert isinstance(db, ThreadedSession)
+
+    todo_model = await db.scalar(select(Todos).where(Todos.id == 1))
+    assert todo_model.title == "Learn to code"
+
+    await db_generator.aclose()
+
+
+@pytest.mark.asyncio
+async def test_threaded_session_commit(test_todo):
+    db = ThreadedSession(TestingSessionLocal())
+    todo_model = await db.get(Todos, 1)
+    todo_model.complete = True
+    db.add(todo_model)
+    await db.commit()
+    await db.close()
+
+    async with TestingAsyncSessionLocal() as async_db:
+        todo_model = await async_db.get(Todos, 1)
+    assert todo_model.complete is True
+
+
+@pytest.mark.asyncio
+async def test_threaded_session_stream(test_todo):
+    async with ThreadedSession(TestingSessionLocal()) as db:
+        result = await db.stream(select(Todos.id, Todos.title))
+        partitions = [rows async for rows in result.partitions(10)]
+    assert partitions == [[(1, "Learn to code")]]
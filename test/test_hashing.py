@@ -0,0 +1,27 @@
+import pytest
+
+from app.hashing import PasswordHasher, bcrypt_context
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor", ["thread", "process"])
+async def test_password_hasher_roundtrip(executor):
+    hasher = PasswordHasher(executor, workers=2)
+    try:
+        hashed_password = await hasher.hash("test1234!")
+        assert bcrypt_context.verify("test1234!", hashed_password)
+        assert await hasher.verify("test1234!", hashed_password) is True
+        assert await hasher.verify("wrong_pass", hashed_password) is False
+    finally:
+        hasher.shutdown()
+
+    stats = hasher.stats()
+    assert stats["executor"] == executor
+    assert stats["completed"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["queued"] == 0
+
+
+def test_password_hasher_unknown_executor():
+    with pytest.raises(ValueError):
+        PasswordHasher("fiber")
@@ -0,0 +1,54 @@
+from fastapi import status
+
+from api.todos import get_async_db, get_request_user
+from app.metrics import Histogram, instrument_engine
+from .utils import *
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_request_user] = override_get_current_user
+
+instrument_engine(async_engine.sync_engine)
+
+
+def metric_value(body: str, series: str) -> float:
+    for line in body.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_keyed_by_route_template(test_todo):
+    series = (
+        'http_requests_total{method="GET",route="/api/todo/{todo_id}",status="200"}'
+    )
+    queries = 'db_queries_total{route="/api/todo/{todo_id}"}'
+    before = client.get("/metrics").text
+
+    client.get("/api/todo/1")
+    client.get("/api/todo/1")
+    response = client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert metric_value(response.text, series) == metric_value(before, series) + 2
+    assert metric_value(response.text, queries) >= metric_value(before, queries) + 2
+    assert "/api/todo/1" not in response.text
+
+
+def test_unmatched_paths_share_one_series():
+    client.get("/does-not-exist/1")
+    client.get("/does-not-exist/2")
+    assert 'route="unmatched",status="404"' in client.get("/metrics").text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value)
+    assert histogram.render("latency", 'route="/"') == [
+        'latency_bucket{route="/",le="0.1"} 1',
+        'latency_bucket{route="/",le="1.0"} 3',
+        'latency_bucket{route="/",le="+Inf"} 4',
+        'latency_sum{route="/"} 6.25',
+        'latency_count{route="/"} 4',
+    ]
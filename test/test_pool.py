@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from app.db.pool import PoolMetrics
+
+
+@pytest.fixture
+def metered_engine(tmp_path):
+    metrics = PoolMetrics()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=metrics.poolclass(QueuePool),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    metrics.attach(engine)
+    yield engine, metrics
+    engine.dispose()
+
+
+def test_pool_metrics_track_checkouts_and_overflow(metered_engine):
+    engine, metrics = metered_engine
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+        stats = metrics.stats()
+        assert stats["checked_out"] == 2
+        assert stats["overflow"] == 1
+
+    stats = metrics.stats()
+    assert stats["checked_out"] == 0
+    assert stats["peak_checked_out"] == 2
+    assert stats["peak_overflow"] == 1
+    assert stats["checkouts"] == stats["checkins"] == 2
+
+
+def test_pool_metrics_count_timeouts(metered_engine):
+    engine, metrics = metered_engine
+    with engine.connect(), engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    stats = metrics.stats()
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_ms"] >= 50
+
+
+def test_pool_metrics_survive_dispose(metered_engine):
+    engine, metrics = metered_engine
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert metrics.stats()["checkouts"] == 1
@@ -0,0 +1,112 @@
+import pytest
+from fastapi import status
+from sqlalchemy import insert
+
+from api.todos import get_async_db, get_request_user
+from app.db.pagination import encode_cursor
+from .utils import *
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_request_user] = override_get_current_user
+
+TODOS_PER_USER = 200
+
+ENDPOINTS = [
+    ("GET", "/api/", None),
+    ("GET", f"/api/?cursor={encode_cursor('id', 1, 50)}", None),
+    ("GET", "/api/?sort=priority", None),
+    (
+        "GET",
+        f"/api/?sort=-priority&cursor={encode_cursor('-priority', 1, 51, 3)}",
+        None,
+    ),
+    ("GET", "/api/?complete=false&priority_min=4&priority_max=5&sort=-priority", None),
+    ("GET", "/api/?title_prefix=Todo%201&sort=-id", None),
+    ("GET", "/api/todo/11", None),
+    (
+        "PUT",
+        "/api/todo/11",
+        {"title": "Planned", "description": "Planned", "priority": 1, "complete": True},
+    ),
+    ("DELETE", "/api/todo/13", None),
+    ("GET", "/api/admin/todo", None),
+    ("GET", f"/api/admin/todo?cursor={encode_cursor('id', 50)}", None),
+    ("DELETE", "/api/admin/todo/15", None),
+    ("GET", "/api/user/", None),
+    ("PUT", "/api/user/phone_number/123456789", None),
+    (
+        "POST",
+        "/api/auth/",
+        {
+            "username": "planner",
+            "email": "planner@email.com",
+            "first_name": "plan",
+            "last_name": "ner",
+            "password": "test1234!",
+            "role": "standard",
+            "phone_number": "(222)-222-2222",
+        },
+    ),
+]
+
+
+@pytest.fixture
+def seeded_db():
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Users),
+            [
+                {
+                    "id": owner_id,
+                    "username": f"user{owner_id}",
+                    "email": f"{owner_id}@x",
+                }
+                for owner_id in (1, 2)
+            ],
+        )
+        conn.execute(
+            insert(Todos),
+            [
+                {
+                    "title": f"Todo {i}",
+                    "description": "Seeded",
+                    "priority": i % 5 + 1,
+                    "complete": False,
+                    "owner_id": i % 2 + 1,
+                }
+                for i in range(2 * TODOS_PER_USER)
+            ],
+        )
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM todos;"))
+        conn.execute(text("DELETE FROM users;"))
+
+
+def full_scans(statement, parameters):
+    """Plan steps that read a whole table or sort outside an index."""
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        details = [row[-1] for row in plan]
+    return [
+        detail
+        for detail in details
+        if (detail.startswith("SCAN") and "INDEX" not in detail)
+        or detail.startswith("USE TEMP B-TREE")
+    ]
+
+
+@pytest.mark.parametrize("method, url, body", ENDPOINTS)
+def test_endpoint_queries_use_indexes(seeded_db, method, url, body):
+    with capture_statements() as statements:
+        response = client.request(method, url, json=body)
+    assert response.status_code < 300
+
+    queries = [
+        (statement, parameters)
+        for statement, parameters in statements
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+    ]
+    assert queries
+    for statement, parameters in queries:
+        assert full_scans(statement, parameters) == [], statement
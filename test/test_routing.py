@@ -0,0 +1,78 @@
+import pytest
+from fastapi import status
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from api.todos import get_async_db, get_request_user
+from app.db.routing import MemoryBackend, ReadRouter, SQLiteBackend, read_router
+from .utils import *
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_request_user] = override_get_current_user
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A second SQLite file standing in for a replica that lags the primary."""
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica_engine)
+    with sessionmaker(bind=replica_engine)() as db:
+        db.add(Todos(title="Replica copy", priority=1, complete=False, owner_id=1))
+        db.commit()
+    replica_engine.dispose()
+
+    replica_async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", poolclass=NullPool
+    )
+    clock = FakeClock()
+    monkeypatch.setattr(
+        read_router,
+        "replica_factory",
+        async_sessionmaker(bind=replica_async_engine, expire_on_commit=False),
+    )
+    monkeypatch.setattr(read_router, "clock", clock)
+    monkeypatch.setattr(read_router, "backend", MemoryBackend(10, clock=clock))
+    yield clock
+
+
+def titles(response):
+    return [todo["title"] for todo in response.json()["todos"]]
+
+
+def test_reads_go_to_replica(test_todo, replica):
+    assert titles(client.get("/api/")) == ["Replica copy"]
+
+
+def test_reads_follow_own_writes_until_window_passes(test_todo, replica):
+    response = client.put("/api/todo/1/complete")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert titles(client.get("/api/")) == ["Learn to code"]
+
+    replica.now += read_router.window
+    assert titles(client.get("/api/")) == ["Replica copy"]
+
+
+@pytest.mark.asyncio
+async def test_read_router_without_replica_uses_primary():
+    router = ReadRouter(None)
+    await router.mark_write(1)
+    assert await router.use_replica(1) is False
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_shares_writes_between_workers(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "writers.db")
+    first, second = [
+        ReadRouter(
+            object(), window=5, backend=SQLiteBackend(path, clock=clock), clock=clock
+        )
+        for _ in range(2)
+    ]
+
+    await first.mark_write(1)
+    assert await second.use_replica(1) is False
+    assert await second.use_replica(2) is True
+
+    clock.now += 5
+    assert await second.use_replica(1) is True
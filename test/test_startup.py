@@ -0,0 +1,39 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.startup import StartupTimer, alembic_head, ensure_schema
+
+
+def test_ensure_schema_creates_tables_until_migrated(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    assert ensure_schema(engine) is True
+    assert {"users", "todos"} <= set(inspect(engine).get_table_names())
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT version_num FROM alembic_version")) == (
+            alembic_head()
+        )
+
+    assert ensure_schema(engine) is False
+    engine.dispose()
+
+
+def test_ensure_schema_leaves_outdated_database_to_alembic(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)")
+        )
+        connection.execute(text("INSERT INTO alembic_version VALUES ('5f1014d9c8bb')"))
+
+    assert ensure_schema(engine) is False
+    assert inspect(engine).get_table_names() == ["alembic_version"]
+    assert "run `alembic upgrade head`" in caplog.text
+    engine.dispose()
+
+
+def test_startup_timer_reports_phases():
+    timer = StartupTimer()
+    with timer.phase("schema"):
+        pass
+    report = timer.report()
+    assert list(report["phases_ms"]) == ["schema"]
+    assert report["total_ms"] >= report["phases_ms"]["schema"]
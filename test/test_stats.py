@@ -0,0 +1,98 @@
+from fastapi import status
+from sqlalchemy import update
+
+from api.admin import get_async_db, get_request_user
+from app.db.models import TodoStats
+from app.db.stats import drift, repair
+from .utils import *
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_request_user] = override_get_current_user
+
+
+def new_todo(priority: int, complete: bool = False) -> dict:
+    return {
+        "title": "Stats todo",
+        "description": "Counted",
+        "priority": priority,
+        "complete": complete,
+    }
+
+
+def test_read_stats(test_todo):
+    with assert_statements("SELECT todo_stats"):
+        response = client.get("/api/todos/stats")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "total": 1,
+        "complete": 0,
+        "incomplete": 1,
+        "incomplete_by_priority": {"5": 1},
+    }
+
+
+def test_stats_follow_every_write_path(test_todo):
+    client.post("/api/todo", json=new_todo(2))
+    client.post("/api/todos/batch", json=[new_todo(2), new_todo(3, complete=True)])
+    client.put("/api/todo/1", json=new_todo(3))
+    client.put("/api/todo/2/complete")
+    client.put("/api/todos/batch/complete", json={"ids": [3, 4], "complete": False})
+    client.post("/api/todos/batch/delete", json={"ids": [4]})
+    client.delete("/api/admin/todo/3")
+
+    response = client.get("/api/todos/stats")
+    assert response.json() == {
+        "total": 2,
+        "complete": 1,
+        "incomplete": 1,
+        "incomplete_by_priority": {"3": 1},
+    }
+    with engine.connect() as conn:
+        assert drift(conn) == []
+
+
+def test_admin_todo_stats(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        [
+            Todos(title="Other", description="Second owner", priority=5, owner_id=2),
+            Todos(
+                title="Done",
+                description="Second owner",
+                priority=1,
+                complete=True,
+                owner_id=2,
+            ),
+        ]
+    )
+    db.commit()
+
+    with assert_statements("SELECT todo_stats", "SELECT todo_stats"):
+        response = client.get("/api/admin/stats/todos")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "total": 3,
+        "complete": 1,
+        "incomplete": 2,
+        "incomplete_by_priority": {"5": 2},
+        "owners": 2,
+    }
+
+
+def test_repair_reports_and_fixes_drift(test_todo):
+    with engine.begin() as conn:
+        conn.execute(
+            update(TodoStats)
+            .where(TodoStats.owner_id == 1, TodoStats.priority == 5)
+            .where(TodoStats.complete.is_(False))
+            .values(count=7)
+        )
+
+    assert repair(bind=engine, dry_run=True) == [
+        {"owner_id": 1, "priority": 5, "complete": False, "expected": 1, "stored": 7}
+    ]
+    assert client.get("/api/todos/stats").json()["total"] == 7
+
+    assert len(repair(bind=engine)) == 1
+    assert repair(bind=engine) == []
+    assert client.get("/api/todos/stats").json()["total"] == 1
@@ -0,0 +1,19 @@
+import os
+
+from app.templating import (
+    TEMPLATES_AUTO_RELOAD,
+    TEMPLATES_DIR,
+    env,
+    precompile_templates,
+)
+
+
+def test_precompile_templates_loads_every_template():
+    names = precompile_templates()
+    assert set(names) == set(os.listdir(TEMPLATES_DIR))
+    assert {"layout.html", "navbar.html", "home.html"} <= set(names)
+
+
+def test_environment_uses_bytecode_cache():
+    assert env.bytecode_cache is not None
+    assert env.auto_reload is TEMPLATES_AUTO_RELOAD
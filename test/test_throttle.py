@@ -0,0 +1,92 @@
+import pytest
+from fastapi import status
+
+import api.auth
+from api.auth import get_async_db
+from app.hashing import password_hasher
+from app.throttle import LoginThrottle, MemoryBackend, SQLiteBackend
+from .utils import *
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_refills():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+
+    assert [await backend.take("ip:a", 0.5, 2) for _ in range(3)] == [0, 0, 2.0]
+    assert await backend.take("ip:b", 0.5, 2) == 0
+
+    clock.now += 1
+    assert await backend.take("ip:a", 0.5, 2) == 1.0
+    clock.now += 1
+    assert await backend.take("ip:a", 0.5, 2) == 0
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_shared_between_workers(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "throttle.db")
+    first, second = SQLiteBackend(path, clock=clock), SQLiteBackend(path, clock=clock)
+
+    assert await first.take("user:admin", 1.0, 2) == 0
+    assert await second.take("user:admin", 1.0, 2) == 0
+    assert await first.take("user:admin", 1.0, 2) == 1.0
+
+    clock.now += 1
+    assert await second.take("user:admin", 1.0, 2) == 0
+
+
+@pytest.mark.asyncio
+async def test_login_throttle_checks_ip_before_username():
+    throttle = LoginThrottle(
+        MemoryBackend(), ip_per_minute=1, ip_burst=1, username_burst=1
+    )
+    assert await throttle.check("Admin", "10.0.0.1") == 0
+    # The rejected IP does not spend the other username's token.
+    assert await throttle.check("other", "10.0.0.1") > 0
+    assert await throttle.check("other", "10.0.0.2") == 0
+    assert await throttle.check("admin", "10.0.0.3") > 0
+
+    assert throttle.stats() == {
+        "backend": "MemoryBackend",
+        "allowed": 2,
+        "rejected_ip": 1,
+        "rejected_username": 1,
+        "hashes_avoided": 2,
+    }
+
+
+@pytest.fixture
+def strict_throttle(monkeypatch):
+    throttle = LoginThrottle(MemoryBackend(), username_per_minute=1, username_burst=1)
+    monkeypatch.setattr(api.auth, "login_throttle", throttle)
+    return throttle
+
+
+def test_token_rejected_before_db_and_bcrypt(test_user, strict_throttle):
+    form = {"username": "admin", "password": "test1234!"}
+    assert client.post("/api/auth/token", data=form).status_code == 200
+
+    verified = password_hasher.completed
+    with assert_statements():
+        response = client.post("/api/auth/token", data=form)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.json() == {"detail": "Too many login attempts"}
+    assert response.headers["retry-after"] == "60"
+    assert password_hasher.completed == verified
+    assert strict_throttle.stats()["hashes_avoided"] == 1
+
+
+def test_html_login_throttled(test_user, strict_throttle):
+    form = {"email": "admin", "password": "test1234!"}
+    response = client.post("/auth/", data=form, follow_redirects=False)
+    client.cookies.clear()
+    assert response.status_code == status.HTTP_302_FOUND
+
+    with assert_statements():
+        response = client.post("/auth/", data=form, follow_redirects=False)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert "Too many attempts" in response.text
+    assert "retry-after" in response.headers
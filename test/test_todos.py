@@ -1,29 +1,225 @@
-from api.todos import get_db, get_current_user
+from datetime import timedelta
+
+from api.auth import create_access_token
+from api.todos import get_async_db, get_request_user, list_statement, page_cache
 from fastapi import status
 from .utils import *
 
 
-app.dependency_overrides[get_db] = override_get_db
-app.dependency_overrides[get_current_user] = override_get_current_user
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_request_user] = override_get_current_user
 
 
 def test_read_all_authenticated(test_todo):
-    response = client.get("/api/")
+    with assert_statements("SELECT users", "SELECT todos"):
+        response = client.get("/api/")
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == [
-        {
+    assert response.json() == {
+        "todos": [
+            {
+                "complete": False,
+                "description": "Need to learn everyday",
+                "id": 1,
+                "owner_id": 1,
+                "title": "Learn to code",
+                "priority": 5,
+            }
+        ],
+        "next_cursor": None,
+    }
+
+
+def test_read_all_paginated(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        [
+            Todos(title="Second", description="Second todo", priority=1, owner_id=1),
+            Todos(title="Other", description="Not mine", priority=1, owner_id=2),
+            Todos(title="Third", description="Third todo", priority=1, owner_id=1),
+        ]
+    )
+    db.commit()
+
+    with assert_statements("SELECT users", "SELECT todos"):
+        response = client.get("/api/", params={"limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    assert [todo["id"] for todo in page["todos"]] == [1, 2]
+    assert page["next_cursor"] is not None
+
+    response = client.get("/api/", params={"limit": 2, "cursor": page["next_cursor"]})
+    page = response.json()
+    assert [todo["id"] for todo in page["todos"]] == [4]
+    assert page["next_cursor"] is None
+
+
+def test_read_all_invalid_cursor(test_todo):
+    with assert_statements():
+        response = client.get("/api/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.fixture
+def filter_todos(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        [
+            Todos(title="Learn 100%", description="Percent", priority=4, owner_id=1),
+            Todos(title="Walk dog", description="Walk", priority=2, owner_id=1),
+            Todos(
+                title="Learn SQL",
+                description="Done",
+                priority=4,
+                complete=True,
+                owner_id=1,
+            ),
+            Todos(title="Learn Go", description="Not mine", priority=5, owner_id=2),
+        ]
+    )
+    db.commit()
+
+
+@pytest.mark.parametrize(
+    "params, ids",
+    [
+        ({"complete": False}, [1, 2, 3]),
+        ({"complete": True}, [4]),
+        ({"priority_min": 4}, [1, 2, 4]),
+        ({"priority_min": 3, "priority_max": 4}, [2, 4]),
+        ({"title_prefix": "Learn"}, [1, 2, 4]),
+        ({"title_prefix": "Learn 1"}, [2]),
+        ({"title_prefix": "Learn_"}, []),
+        ({"complete": False, "priority_min": 4}, [1, 2]),
+        ({"sort": "-id"}, [4, 3, 2, 1]),
+        ({"sort": "priority"}, [3, 2, 4, 1]),
+        ({"sort": "-priority", "title_prefix": "L"}, [1, 4, 2]),
+    ],
+)
+def test_read_all_filtered(filter_todos, params, ids):
+    with assert_statements("SELECT users", "SELECT todos"):
+        response = client.get("/api/", params=params)
+    assert response.status_code == status.HTTP_200_OK
+    assert [todo["id"] for todo in response.json()["todos"]] == ids
+
+
+@pytest.mark.parametrize(
+    "sort, ids", [("priority", [3, 2, 4, 1]), ("-priority", [1, 4, 2, 3])]
+)
+def test_read_all_sorted_paginated(filter_todos, sort, ids):
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 1, "sort": sort}
+        if cursor is not None:
+            params["cursor"] = cursor
+        page = client.get("/api/", params=params).json()
+        seen += [todo["id"] for todo in page["todos"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ids
+
+
+@pytest.mark.parametrize(
+    "first, second", [("id", "priority"), ("id", "-id"), ("priority", "-priority")]
+)
+def test_read_all_cursor_must_match_sort(filter_todos, first, second):
+    params = {"limit": 1, "sort": first}
+    cursor = client.get("/api/", params=params).json()["next_cursor"]
+    response = client.get("/api/", params={"sort": second, "cursor": cursor})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_read_all_filters_change_etag(test_user, filter_todos):
+    first = client.get("/api/", params={"title_prefix": "Learn"}).headers["etag"]
+    second = client.get("/api/", params={"title_prefix": 'Le"arn'}).headers["etag"]
+    assert first != second
+    assert '"' not in second.strip('"')
+
+
+def test_list_statement_cached_across_values():
+    first = list_statement(1, (1, 9, 2), False, 4, None, "Learn", "priority")
+    second = list_statement(2, (2, 5, 3), True, 1, None, "Walk", "priority")
+    other_sort = list_statement(2, (2, 5, 3), True, 1, None, "Walk", "-priority")
+    assert first._generate_cache_key().key == second._generate_cache_key().key
+    assert first._generate_cache_key().key != other_sort._generate_cache_key().key
+
+
+@pytest.fixture
+def search_todos(test_todo):
+    db = TestingSessionLocal()
+    db.add_all(
+        [
+            Todos(
+                title="Buy milk", description="Coding snacks", priority=1, owner_id=1
+            ),
+            Todos(
+                title="Code review", description="Review PRs", priority=2, owner_id=1
+            ),
+            Todos(title="Write code", description="Learning", priority=3, owner_id=2),
+        ]
+    )
+    db.commit()
+
+
+@pytest.mark.parametrize(
+    "q, ids",
+    [
+        # Stemmed, and a title match ranks above a description match.
+        ("code", [3, 1, 2]),
+        ("learn", [1]),
+        ("code review", [3]),
+        ("MILK", [2]),
+        ('milk" OR "code', []),
+        ("nothing", []),
+        ("   ", []),
+    ],
+)
+def test_search_todos(search_todos, q, ids):
+    response = client.get("/api/todos/search", params={"q": q})
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["todos"]
+    assert [todo["id"] for todo in results] == ids
+    assert all(todo["owner_id"] == 1 for todo in results)
+    assert [todo["score"] for todo in results] == sorted(
+        (todo["score"] for todo in results), reverse=True
+    )
+
+
+def test_search_todos_paginated(search_todos):
+    page = client.get("/api/todos/search", params={"q": "code", "limit": 2}).json()
+    assert [todo["id"] for todo in page["todos"]] == [3, 1]
+    assert page["next_offset"] == 2
+
+    params = {"q": "code", "limit": 2, "offset": page["next_offset"]}
+    page = client.get("/api/todos/search", params=params).json()
+    assert [todo["id"] for todo in page["todos"]] == [2]
+    assert page["next_offset"] is None
+
+
+def test_search_todos_follows_writes(search_todos):
+    client.put(
+        "/api/todo/2",
+        json={
+            "title": "Buy oat milk",
+            "description": "Snacks",
+            "priority": 1,
             "complete": False,
-            "description": "Need to learn everyday",
-            "id": 1,
-            "owner_id": 1,
-            "title": "Learn to code",
-            "priority": 5,
-        }
-    ]
+        },
+    )
+    client.delete("/api/todo/3")
+
+    response = client.get("/api/todos/search", params={"q": "oat"})
+    assert [todo["id"] for todo in response.json()["todos"]] == [2]
+    response = client.get("/api/todos/search", params={"q": "code"})
+    assert [todo["id"] for todo in response.json()["todos"]] == [1]
 
 
 def test_read_one_authenticated(test_todo):
-    response = client.get("/api/todo/1")
+    with assert_statements("SELECT users", "SELECT todos"):
+        response = client.get("/api/todo/1")
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {
         "complete": False,
@@ -36,11 +232,73 @@ def test_read_one_authenticated(test_todo):
 
 
 def test_read_one_authenticated_not_found(test_todo):
-    response = client.get("/api/todo/99")
+    with assert_statements("SELECT users", "SELECT todos"):
+        response = client.get("/api/todo/99")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json() == {"detail": "Todo not found"}
 
 
+def test_read_all_etag_not_modified(test_user, test_todo):
+    response = client.get("/api/")
+    etag = response.headers["etag"]
+
+    with assert_statements("SELECT users"):
+        response = client.get("/api/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["etag"] == etag
+
+
+def test_read_all_etag_varies_by_page(test_user, test_todo):
+    first = client.get("/api/").headers["etag"]
+    assert client.get("/api/", params={"limit": 1}).headers["etag"] != first
+
+
+def test_read_one_etag_not_modified(test_user, test_todo):
+    etag = client.get("/api/todo/1").headers["etag"]
+    with assert_statements("SELECT users"):
+        response = client.get("/api/todo/1", headers={"If-None-Match": f"W/{etag}"})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.parametrize(
+    "method, url, json",
+    [
+        (
+            "post",
+            "/api/todo",
+            {
+                "title": "New",
+                "description": "New todo",
+                "priority": 1,
+                "complete": False,
+            },
+        ),
+        (
+            "put",
+            "/api/todo/1",
+            {
+                "title": "Changed",
+                "description": "Changed todo",
+                "priority": 1,
+                "complete": False,
+            },
+        ),
+        ("put", "/api/todo/1/complete", None),
+        ("delete", "/api/todo/1", None),
+        ("post", "/api/todos/batch/delete", {"ids": [1]}),
+        ("delete", "/api/admin/todo/1", None),
+    ],
+)
+def test_mutations_change_etag(test_user, test_todo, method, url, json):
+    etag = client.get("/api/").headers["etag"]
+    response = client.request(method, url, json=json)
+    assert response.status_code < 300
+
+    response = client.get("/api/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
+
+
 def test_create_todo(test_todo):
     request_data = {
         "title": "New todo",
@@ -48,7 +306,8 @@ def test_create_todo(test_todo):
         "priority": 5,
         "complete": False,
     }
-    response = client.post("/api/todo", json=request_data)
+    with assert_statements("INSERT todos"):
+        response = client.post("/api/todo", json=request_data)
     assert response.status_code == status.HTTP_201_CREATED
 
     db = TestingSessionLocal()
@@ -68,7 +327,8 @@ def test_update_todo(test_todo):
         "complete": False,
     }
 
-    response = client.put("/api/todo/1", json=request_data)
+    with assert_statements("UPDATE todos"):
+        response = client.put("/api/todo/1", json=request_data)
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
     db = TestingSessionLocal()
@@ -84,13 +344,15 @@ def test_update_todo_not_found(test_todo):
         "complete": False,
     }
 
-    response = client.put("/api/todo/99", json=request_data)
+    with assert_statements("UPDATE todos"):
+        response = client.put("/api/todo/99", json=request_data)
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json() == {"detail": "Todo not found"}
 
 
 def test_delete_todo(test_todo):
-    response = client.delete("/api/todo/1")
+    with assert_statements("DELETE todos"):
+        response = client.delete("/api/todo/1")
     assert response.status_code == status.HTTP_204_NO_CONTENT
     db = TestingSessionLocal()
     model = db.query(Todos).filter(Todos.id == 1).first()
@@ -98,6 +360,162 @@ def test_delete_todo(test_todo):
 
 
 def test_delete_todo_not_found(test_todo):
-    response = client.delete("/api/todo/999")
+    with assert_statements("DELETE todos"):
+        response = client.delete("/api/todo/999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "Todo not found"}
+
+
+def test_delete_todo_page(test_todo):
+    response = client.get("/todos/delete/1", follow_redirects=False)
+    assert response.status_code == status.HTTP_302_FOUND
+    assert response.headers["location"] == "/todos"
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 1).first() is None
+
+    response = client.get("/todos/delete/1", follow_redirects=False)
+    assert response.status_code == status.HTTP_302_FOUND
+
+
+def test_complete_todo(test_todo):
+    with assert_statements("UPDATE todos"):
+        response = client.put("/api/todo/1/complete")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    db = TestingSessionLocal()
+    model = db.query(Todos).filter(Todos.id == 1).first()
+    assert model.complete is True
+
+    client.put("/api/todo/1/complete")
+    db.refresh(model)
+    assert model.complete is False
+
+
+def test_complete_todo_not_found(test_todo):
+    with assert_statements("UPDATE todos"):
+        response = client.put("/api/todo/99/complete")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json() == {"detail": "Todo not found"}
+
+
+def test_create_todos_batch(test_todo):
+    request_data = [
+        {
+            "title": "First batch",
+            "description": "One",
+            "priority": 1,
+            "complete": False,
+        },
+        {
+            "title": "Second batch",
+            "description": "Two",
+            "priority": 2,
+            "complete": True,
+        },
+    ]
+    # Postgres sends the batch as one INSERT with sorted RETURNING; SQLite
+    # cannot tie RETURNING rows to parameters, so SQLAlchemy inserts per row.
+    with assert_statements(*["INSERT todos"] * len(request_data)):
+        response = client.post("/api/todos/batch", json=request_data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json() == [
+        {"index": 0, "id": 2, "status": "created"},
+        {"index": 1, "id": 3, "status": "created"},
+    ]
+
+    db = TestingSessionLocal()
+    model = db.query(Todos).filter(Todos.id == 3).first()
+    assert model.title == "Second batch"
+    assert model.complete is True
+    assert model.owner_id == override_get_current_user()["id"]
+
+
+def test_create_todos_batch_validates_every_item(test_todo):
+    request_data = [
+        {
+            "title": "Valid todo",
+            "description": "Fine",
+            "priority": 1,
+            "complete": False,
+        },
+        {"title": "Bad", "description": "Priority", "priority": 9, "complete": False},
+    ]
+    with assert_statements():
+        response = client.post("/api/todos/batch", json=request_data)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).count() == 1
+
+
+def test_complete_todos_batch(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title="Not mine", description="Other", priority=1, owner_id=2))
+    db.commit()
+
+    with assert_statements("UPDATE todos"):
+        response = client.put("/api/todos/batch/complete", json={"ids": [1, 2, 99]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"id": 1, "status": "updated"},
+        {"id": 2, "status": "not_found"},
+        {"id": 99, "status": "not_found"},
+    ]
+
+    db.expire_all()
+    assert db.query(Todos).filter(Todos.id == 1).first().complete is True
+    assert db.query(Todos).filter(Todos.id == 2).first().complete is False
+
+
+def test_delete_todos_batch(test_todo):
+    with assert_statements("DELETE todos"):
+        response = client.post("/api/todos/batch/delete", json={"ids": [1, 99]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"id": 1, "status": "deleted"},
+        {"id": 99, "status": "not_found"},
+    ]
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 1).first() is None
+
+
+def test_home_page_cached_until_write(test_user, test_todo):
+    page_cache.clear()
+    token = create_access_token("admin", 1, "admin", timedelta(minutes=5))
+    client.cookies.set("access_token", token)
+    try:
+        with assert_statements("SELECT users", "SELECT todos"):
+            response = client.get("/todos")
+        assert response.status_code == status.HTTP_200_OK
+        assert "Learn to code" in response.text
+
+        with assert_statements("SELECT users"):
+            response = client.get("/todos")
+        assert "Learn to code" in response.text
+
+        client.put(
+            "/api/todo/1",
+            json={
+                "title": "Changed title",
+                "description": "Need to learn everyday",
+                "priority": 5,
+                "complete": False,
+            },
+        )
+        response = client.get("/todos")
+        assert "Changed title" in response.text
+        assert page_cache.stats()["hits"] == 1
+    finally:
+        client.cookies.clear()
+
+
+def test_home_page_sees_writes_from_other_workers(test_user, test_todo):
+    page_cache.clear()
+    client.get("/todos")
+
+    # Written behind this process's back, as another worker would.
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE todos SET title = 'Elsewhere' WHERE id = 1"))
+
+    assert "Elsewhere" in client.get("/todos").text
@@ -1,13 +1,14 @@
 from .utils import *
-from api.users import get_current_user, get_db
+from api.users import get_request_user, get_async_db
 from fastapi import status
 
-app.dependency_overrides[get_db] = override_get_db
-app.dependency_overrides[get_current_user] = override_get_current_user
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_request_user] = override_get_current_user
 
 
 def test_return_user(test_user):
-    response = client.get("/api/user")
+    with assert_statements("SELECT users"):
+        response = client.get("/api/user")
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["username"] == "admin"
     assert response.json()["email"] == "admin@email.com"
@@ -15,25 +16,36 @@ def test_return_user(test_user):
     assert response.json()["last_name"] == "admin"
     assert response.json()["role"] == "admin"
     assert response.json()["phone_number"] == "(111)-111-1111"
+    assert "hashed_password" not in response.json()
+
+
+def test_return_user_not_found():
+    with assert_statements("SELECT users"):
+        response = client.get("/api/user")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "User not found"}
 
 
 def test_change_password_success(test_user):
-    response = client.put(
-        "/api/user/password",
-        json={"password": "test1234!", "new_password": "newpassword"},
-    )
+    with assert_statements("SELECT users", "UPDATE users"):
+        response = client.put(
+            "/api/user/password",
+            json={"password": "test1234!", "new_password": "newpassword"},
+        )
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
 
 def test_change_password_invalid(test_user):
-    response = client.put(
-        "/api/user/password",
-        json={"password": "wrong_password", "new_password": "newpassword"},
-    )
+    with assert_statements("SELECT users"):
+        response = client.put(
+            "/api/user/password",
+            json={"password": "wrong_password", "new_password": "newpassword"},
+        )
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
     assert response.json() == {"detail": "Error on password change"}
 
 
 def test_change_phone_number_success(test_user):
-    response = client.put("/api/user/phone_number/222222222")
+    with assert_statements("SELECT users", "UPDATE users"):
+        response = client.put("/api/user/phone_number/222222222")
     assert response.status_code == status.HTTP_204_NO_CONTENT
@@ -1,15 +1,19 @@
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
-from api.auth import bcrypt_context
 from app.db.database import Base
 from app.db.models import Todos, Users
+from app.hashing import bcrypt_context
 from main import app
 
 SQLALCHEMY_DB_URL = "sqlite:///./testdb.db"
+SQLALCHEMY_ASYNC_DB_URL = "sqlite+aiosqlite:///./testdb.db"
 
 engine = create_engine(
     SQLALCHEMY_DB_URL,
@@ -19,6 +23,14 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient may run each request on a fresh event loop, so async connections
+# must not be pooled across requests.
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DB_URL, poolclass=NullPool)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base.metadata.create_all(bind=engine)
 
 
@@ -30,6 +42,15 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+def override_get_session_factory():
+    return TestingAsyncSessionLocal
+
+
 def override_get_current_user():
     return {"username": "admin", "id": 1, "user_role": "admin"}
 
@@ -37,6 +58,63 @@ def override_get_current_user():
 client = TestClient(app)
 
 
+class FakeClock:
+    """A clock for caches, throttles and routers that moves only when told."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@contextmanager
+def capture_statements():
+    """Collect (statement, parameters) for every query the app runs."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+    try:
+        yield statements
+    finally:
+        event.remove(
+            async_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+        )
+
+
+def statement_kind(statement: str) -> str:
+    """Verb and table of a statement, e.g. "SELECT todos" or "UPDATE users"."""
+    words = statement.split()
+    verb = words[0].upper()
+    if verb == "SELECT":
+        table = words[words.index("FROM") + 1] if "FROM" in words else ""
+    elif verb in ("INSERT", "DELETE"):
+        table = words[2]
+    elif verb == "UPDATE":
+        table = words[1]
+    else:
+        table = ""
+    return f"{verb} {table}".strip()
+
+
+@contextmanager
+def assert_statements(*expected: str):
+    """
+    Fail unless the app runs exactly the `expected` statements, in order:
+
+        with assert_statements("SELECT users", "UPDATE users"):
+            client.put("/api/user/password", json=...)
+    """
+    with capture_statements() as statements:
+        yield statements
+    assert [statement_kind(statement) for statement, _ in statements] == list(expected)
+
+
 @pytest.fixture
 def test_todo():
     todo = Todos(